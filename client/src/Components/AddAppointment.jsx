@@ -20,7 +20,7 @@ function AddAppointment({ onAdd }) {
   const [pendingValues, setPendingValues] = useState(null);
 
   useEffect(() => {
-    axios.get(`${API_BASE_URL}/api/pets`).then((res) => setPets(res.data));
+    axios.get(`${API_BASE_URL}/api/pets?fields=id,name`).then((res) => setPets(res.data));
     axios.get(`${API_BASE_URL}/api/staff`).then((res) => setStaff(res.data));
   }, []);
 
@@ -13,7 +13,7 @@ function AddBilling({ onAdd }) {
   const [pendingValues, setPendingValues] = useState(null);
 
   useEffect(() => {
-    axios.get(`${API_BASE_URL}/api/pets`).then((res) => setPets(res.data));
+    axios.get(`${API_BASE_URL}/api/pets?fields=id,name`).then((res) => setPets(res.data));
   }, []);
 
   const formik = useFormik({
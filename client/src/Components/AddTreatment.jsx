@@ -15,7 +15,7 @@ function AddTreatment({ onAddTreatment }) {
 
   useEffect(() => {
     axios.get(`${API_BASE_URL}/api/staff`).then((res) => setStaff(res.data));
-    axios.get(`${API_BASE_URL}/api/pets`).then((res) => setPets(res.data));
+    axios.get(`${API_BASE_URL}/api/pets?fields=id,name`).then((res) => setPets(res.data));
   }, []);
 
   const formik = useFormik({
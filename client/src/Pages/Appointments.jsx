@@ -18,7 +18,7 @@ function Appointments() {
 
     const fetchAppointments = axios.get(`${API_BASE_URL}/api/appointments`);
     const fetchStaff = axios.get(`${API_BASE_URL}/api/staff`);
-    const fetchPets = axios.get(`${API_BASE_URL}/api/pets`);
+    const fetchPets = axios.get(`${API_BASE_URL}/api/pets?fields=id,name`);
 
     Promise.all([fetchAppointments, fetchStaff, fetchPets])
       .then(([appointmentsRes, staffRes, petsRes]) => {
@@ -34,7 +34,7 @@ function Billing() {
         setLoading(false);
       });
     axios
-      .get(`${API_BASE_URL}/api/pets`)
+      .get(`${API_BASE_URL}/api/pets?fields=id,name`)
       .then((res) => {
         setPets(res.data);
       })
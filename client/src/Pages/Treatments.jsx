@@ -20,7 +20,7 @@ function Treatments() {
     const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || "http://localhost:5555";
 
     const fetchTreatments = axios.get(`${API_BASE_URL}/api/treatments`);
-    const fetchPets = axios.get(`${API_BASE_URL}/api/pets`);
+    const fetchPets = axios.get(`${API_BASE_URL}/api/pets?fields=id,name`);
     const fetchStaff = axios.get(`${API_BASE_URL}/api/staff`);
 
     Promise.all([fetchTreatments, fetchPets, fetchStaff])
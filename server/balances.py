@@ -0,0 +1,227 @@
+"""Paid/unpaid billing totals per pet and per owner.
+
+``pet_balances`` and ``owner_balances`` hold running totals, so a balance
+lookup is one primary-key read instead of joining owners, pets and billings
+and summing. They are adjusted incrementally inside the writing transaction
+by a session ``after_flush`` hook. The hook sees:
+
+- every Billing insert, amount/paid/pet change and delete, including the
+  deletes cascaded from removing a pet or owner (and from a pet dropped
+  from ``owner.pets``, which delete-orphan removes), and
+- every pet moved to another owner.
+
+Writes that bypass the unit of work (Core inserts such as
+``bulk.insert_rows``) must call ``apply`` themselves.
+``flask balances rebuild`` recomputes both tables from billings.
+"""
+import click
+from flask.cli import AppGroup
+from sqlalchemy import case, delete, event, func, insert, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, object_session
+
+from config import db
+from models import Owner, Pet, Billing, PetBalance, OwnerBalance
+
+FIELDS = ("paid_total", "unpaid_total", "paid_count", "unpaid_count")
+ZERO = (0.0, 0.0, 0, 0)
+
+_DIALECT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+# --- Deltas ---
+# A delta is a (paid_total, unpaid_total, paid_count, unpaid_count) tuple.
+def billing_delta(amount, paid, sign=1):
+    # unflushed objects hold whatever the client sent, e.g. "12.5"; the Float column accepts it
+    amount = float(amount or 0) * sign
+    return (amount, 0.0, sign, 0) if paid else (0.0, amount, 0, sign)
+
+def add_delta(deltas, key, delta):
+    if key is not None:
+        deltas[key] = tuple(a + b for a, b in zip(deltas.get(key, ZERO), delta))
+
+def _negate(delta):
+    return tuple(-v for v in delta)
+
+
+def _increment(conn, model, deltas):
+    """Add ``deltas`` ({primary key: delta}) to the rows of ``model``, creating missing rows."""
+    key = inspect(model).primary_key[0]
+    rows = [{key.name: k, **dict(zip(FIELDS, d))} for k, d in sorted(deltas.items()) if any(d)]
+    if not rows:
+        return
+    dialect_insert = _DIALECT_INSERTS.get(conn.dialect.name)
+    if dialect_insert is None:
+        for row in rows:
+            updated = conn.execute(
+                update(model).where(key == row[key.name])
+                .values({f: getattr(model, f) + row[f] for f in FIELDS})
+            )
+            if not updated.rowcount:
+                conn.execute(insert(model).values(row))
+        return
+    statement = dialect_insert(model).values(rows)
+    conn.execute(statement.on_conflict_do_update(
+        index_elements=[key],
+        set_={f: getattr(model, f) + getattr(statement.excluded, f) for f in FIELDS},
+    ))
+
+
+def _owner_deltas(conn, pet_deltas, known_owners):
+    """Roll per-pet deltas up to their owners; ``known_owners`` covers pets no longer in the table."""
+    owners = dict(known_owners)
+    missing = [pet_id for pet_id in pet_deltas if pet_id not in owners]
+    if missing:
+        owners.update(conn.execute(select(Pet.id, Pet.owner_id).where(Pet.id.in_(missing))).all())
+    owner_deltas = {}
+    for pet_id, delta in pet_deltas.items():
+        add_delta(owner_deltas, owners.get(pet_id), delta)
+    return owner_deltas
+
+
+def apply(conn, pet_deltas):
+    """Add {pet_id: delta} to the pets' balances and their owners'."""
+    _increment(conn, PetBalance, pet_deltas)
+    _increment(conn, OwnerBalance, _owner_deltas(conn, pet_deltas, {}))
+
+
+# --- Incremental maintenance ---
+def _committed(obj, attr):
+    """Value of ``attr`` as of the last flush."""
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else getattr(obj, attr)
+
+def _as_id(value):
+    return int(value) if value not in (None, "") else None
+
+
+def collect_delete(mapper, connection, obj):
+    # as in changes.py: delete-orphan cascades never reach session.deleted
+    object_session(obj).info.setdefault("balances_deleted", []).append(obj)
+
+
+for _model in (Owner, Pet, Billing):
+    event.listen(_model, "after_delete", collect_delete)
+
+
+@event.listens_for(Session, "after_flush")
+def track_billing_changes(session, flush_context):
+    pet_deltas, owner_deltas = {}, {}
+    moved_pets = []  # (pet_id, old owner_id, new owner_id)
+    deleted_pets = {}  # pet_id -> owner_id it had
+    deleted_owners = set()
+    deleted = session.info.pop("balances_deleted", [])
+    deleted_ids = {id(obj) for obj in deleted}
+
+    for obj in session.new:
+        if isinstance(obj, Billing):
+            add_delta(pet_deltas, _as_id(obj.pet_id), billing_delta(obj.amount, obj.paid))
+    for obj in deleted:
+        if isinstance(obj, Billing):
+            add_delta(pet_deltas, _as_id(_committed(obj, "pet_id")),
+                      billing_delta(_committed(obj, "amount"), _committed(obj, "paid"), -1))
+        elif isinstance(obj, Pet):
+            deleted_pets[obj.id] = _as_id(_committed(obj, "owner_id"))
+        elif isinstance(obj, Owner):
+            deleted_owners.add(obj.id)
+    for obj in session.dirty:
+        if id(obj) in deleted_ids:
+            continue
+        if isinstance(obj, Billing):
+            old = (_as_id(_committed(obj, "pet_id")), _committed(obj, "amount"), bool(_committed(obj, "paid")))
+            new = (_as_id(obj.pet_id), obj.amount, bool(obj.paid))
+            if old != new:
+                add_delta(pet_deltas, old[0], billing_delta(old[1], old[2], -1))
+                add_delta(pet_deltas, new[0], billing_delta(new[1], new[2]))
+        elif isinstance(obj, Pet):
+            old_owner, new_owner = _as_id(_committed(obj, "owner_id")), _as_id(obj.owner_id)
+            if old_owner != new_owner:
+                moved_pets.append((obj.id, old_owner, new_owner))
+
+    if not (pet_deltas or moved_pets or deleted_pets or deleted_owners):
+        return
+    conn = session.connection()
+
+    if moved_pets:
+        # move each pet's balance as it was before this flush; billing
+        # changes in the same flush are then credited to the new owner
+        balances = {row.pet_id: row for row in conn.execute(
+            select(PetBalance).where(PetBalance.pet_id.in_([p for p, _, _ in moved_pets]))
+        )}
+        for pet_id, old_owner, new_owner in moved_pets:
+            if pet_id in balances:
+                balance = tuple(getattr(balances[pet_id], f) for f in FIELDS)
+                add_delta(owner_deltas, old_owner, _negate(balance))
+                add_delta(owner_deltas, new_owner, balance)
+
+    pet_deltas = {k: d for k, d in pet_deltas.items() if any(d)}
+    for owner_id, delta in _owner_deltas(conn, pet_deltas, deleted_pets).items():
+        add_delta(owner_deltas, owner_id, delta)
+
+    # rows of deleted pets and owners go away (ON DELETE CASCADE does the
+    # same where foreign keys are enforced)
+    for pet_id in deleted_pets:
+        pet_deltas.pop(pet_id, None)
+    for owner_id in deleted_owners:
+        owner_deltas.pop(owner_id, None)
+    _increment(conn, PetBalance, pet_deltas)
+    _increment(conn, OwnerBalance, owner_deltas)
+    if deleted_pets:
+        conn.execute(delete(PetBalance).where(PetBalance.pet_id.in_(list(deleted_pets))))
+    if deleted_owners:
+        conn.execute(delete(OwnerBalance).where(OwnerBalance.owner_id.in_(list(deleted_owners))))
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_deletes(session):
+    session.info.pop("balances_deleted", None)
+
+
+# --- Reconciliation ---
+def _totals(group_by):
+    paid_amount = case((Billing.paid.is_(True), Billing.amount), else_=0)
+    unpaid_amount = case((Billing.paid.is_(True), 0), else_=Billing.amount)
+    paid_count = case((Billing.paid.is_(True), 1), else_=0)
+    return [
+        group_by,
+        func.coalesce(func.sum(paid_amount), 0),
+        func.coalesce(func.sum(unpaid_amount), 0),
+        func.sum(paid_count),
+        func.count() - func.sum(paid_count),
+    ]
+
+
+def rebuild(conn):
+    """Recompute both tables from billings; returns (pet rows, owner rows)."""
+    conn.execute(delete(PetBalance))
+    conn.execute(delete(OwnerBalance))
+    conn.execute(insert(PetBalance).from_select(
+        ["pet_id", *FIELDS],
+        select(*_totals(Billing.pet_id)).where(Billing.pet_id.is_not(None)).group_by(Billing.pet_id),
+    ))
+    conn.execute(insert(OwnerBalance).from_select(
+        ["owner_id", *FIELDS],
+        select(*_totals(Pet.owner_id)).join(Pet, Pet.id == Billing.pet_id)
+        .where(Pet.owner_id.is_not(None)).group_by(Pet.owner_id),
+    ))
+    return (
+        conn.execute(select(func.count()).select_from(PetBalance)).scalar(),
+        conn.execute(select(func.count()).select_from(OwnerBalance)).scalar(),
+    )
+
+
+def serialize_balance(balance):
+    return {f: getattr(balance, f) if balance is not None else default for f, default in zip(FIELDS, ZERO)}
+
+
+balances_cli = AppGroup("balances", help="Manage the per-pet and per-owner billing balances.")
+
+
+@balances_cli.command("rebuild")
+def rebuild_command():
+    """Recompute the balance tables from billings."""
+    with db.engine.begin() as conn:
+        pets, owners = rebuild(conn)
+    click.echo(f"Balances rebuilt for {pets} pets and {owners} owners.")
@@ -0,0 +1,181 @@
+"""API benchmark: latency, SQL statements and response size for every GET route.
+
+Generates a dataset with seed.py at each size (number of owners; the other
+tables scale with it), then requests every GET route registered under /api
+through the Flask test client and records p50/p99 latency, statements per
+request and response bytes::
+
+    python -m benchmarks.api [--sizes 100 1000 10000] [--save LABEL] [--compare LABEL]
+
+Results are stored under LABEL (default: the current git commit) in
+benchmarks/results/api.json, which is tracked in the repo. ``--compare``
+prints the change against an earlier label and exits non-zero when a
+route got more than ``--threshold`` slower at p50 or issues more statements.
+
+The database is a throwaway SQLite file; pass ``--database-url`` to run
+against a local Postgres instead (its tables are dropped and recreated).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import setup_app, count_queries
+
+RESULTS = os.path.join(os.path.dirname(__file__), "results", "api.json")
+
+# Query strings for routes that need parameters, keyed by URL rule. Date
+# ranges fall inside the generated history, which starts on 2024-01-01.
+QUERIES = {
+    "/api/search": "?q=bea",
+    "/api/staff/<int:id>/availability": "?from=2024-01-02&to=2024-01-09",
+    "/api/appointments/calendar": "?from=2024-01-01&to=2024-01-08",
+    "/api/appointments/export": "?from=2024-01-01&to=2024-01-08",
+    "/api/billings/export": "?from=2024-01-01&to=2024-01-08",
+}
+# Routes with nothing to request in a freshly generated database, and the
+# event stream, which never finishes
+SKIP = {"/api/jobs/<int:id>", "/api/jobs/<int:id>/result", "/api/stream"}
+# Common filtered and paginated variants, on top of every registered route
+EXTRA_ROUTES = [
+    "/api/owners?name=ja",
+    "/api/pets?limit=50",
+    "/api/pets?species=Cat&limit=50",
+    "/api/pets?fields=id,name",
+    "/api/treatments?include=medications&limit=50",
+    "/api/appointments?limit=100",
+    "/api/appointments?staff_id=3&from=2024-01-01&to=2024-02-01",
+    "/api/treatments?limit=50",
+    "/api/billings?paid=false&limit=100",
+    "/api/reports/revenue?period=day&from=2024-01-01&to=2024-02-01",
+    "/api/reports/unpaid-balances?from=2024-01-01&to=2024-04-01&limit=20",
+]
+SAMPLE_ID = 3
+WARMUP = 2
+
+
+def routes(app):
+    """Every GET route under /api, with ids and required parameters filled in."""
+    found = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if not rule.rule.startswith("/api/") or "GET" not in rule.methods or rule.rule in SKIP:
+            continue
+        found.append(rule.rule.replace("<int:id>", str(SAMPLE_ID)) + QUERIES.get(rule.rule, ""))
+    return found + EXTRA_ROUTES
+
+
+def percentile(samples, p):
+    if len(samples) < 2:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[p - 1]
+
+
+def measure_route(client, engine, route, requests, budget):
+    for _ in range(WARMUP):
+        client.get(route)
+    with count_queries(engine) as statements:
+        response = client.get(route)
+    size = len(response.get_data())
+    latencies = []
+    deadline = time.perf_counter() + budget
+    while len(latencies) < requests and (len(latencies) < 3 or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        client.get(route).get_data()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "status": response.status_code,
+        "requests": len(latencies),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "queries": len(statements),
+        "bytes": size,
+    }
+
+
+def run(args):
+    import seed
+
+    app, db = setup_app(database_url=args.database_url)
+    with app.app_context():
+        engine = db.engine
+        dialect = engine.dialect.name
+    client = app.test_client()
+    results = {}
+    for owners in args.sizes:
+        with app.app_context():
+            rows = seed.generate(seed.parse_args(["--owners", str(owners), "--seed", "1"]), log=lambda _: None)
+        print(f"\n{owners} owners ({rows} rows)")
+        print(f"{'route':<70}{'p50 ms':>9}{'p99 ms':>9}{'queries':>9}{'bytes':>11}")
+        results[str(owners)] = {}
+        for route in routes(app):
+            result = measure_route(client, engine, route, args.requests, args.budget)
+            results[str(owners)][route] = result
+            flag = "" if result["status"] in (200, 304) else f"  (status {result['status']})"
+            print(f"{route:<70}{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+                  f"{result['queries']:>9}{result['bytes']:>11}{flag}")
+    return {"python": sys.version.split()[0], "database": dialect, "sizes": results}
+
+
+def compare(current, baseline, threshold):
+    """Print changes against ``baseline``; returns the number of regressions."""
+    regressions = 0
+    print(f"\n{'size':>6} {'route':<70}{'p50 ms':>16}{'queries':>10}")
+    for size, routes_now in current["sizes"].items():
+        for route, now in routes_now.items():
+            before = baseline["sizes"].get(size, {}).get(route)
+            if before is None:
+                continue
+            slower = now["p50_ms"] > before["p50_ms"] * (1 + threshold) and now["p50_ms"] - before["p50_ms"] > 1
+            more_queries = now["queries"] > before["queries"]
+            if slower or more_queries:
+                regressions += 1
+                print(f"{size:>6} {route:<70}{before['p50_ms']:>7.2f} -> {now['p50_ms']:<7.2f}"
+                      f"{before['queries']:>4} -> {now['queries']}")
+    print(f"{regressions} regressions" if regressions else "no regressions")
+    return regressions
+
+
+def git_label():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--requests", type=int, default=50, help="timed requests per route")
+    parser.add_argument("--budget", type=float, default=5.0, help="seconds per route before stopping early")
+    parser.add_argument("--database-url", help="benchmark this database instead of a temporary SQLite file")
+    parser.add_argument("--save", nargs="?", const="", metavar="LABEL",
+                        help="store results under LABEL (default: current git commit)")
+    parser.add_argument("--compare", metavar="LABEL", help="compare against stored results")
+    parser.add_argument("--threshold", type=float, default=0.25, help="p50 slowdown counted as a regression")
+    args = parser.parse_args()
+
+    saved = {}
+    if os.path.exists(RESULTS):
+        with open(RESULTS) as f:
+            saved = json.load(f)
+    if args.compare and args.compare not in saved:
+        parser.error(f"no stored results labelled {args.compare!r}")
+
+    result = run(args)
+
+    if args.save is not None:
+        saved[args.save or git_label()] = result
+        with open(RESULTS, "w") as f:
+            json.dump(saved, f, indent=2)
+            f.write("\n")
+    if args.compare:
+        return 1 if compare(result, saved[args.compare], args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Shared helpers for the scripts in this package.
+
+Scripts are run from the ``server`` directory, e.g.::
+
+    python -m benchmarks.query_counts
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert
+
+
+def setup_app(db_path=None, database_url=None):
+    """Point the app at a fresh database and return (app, db).
+
+    Defaults to a new SQLite file; ``database_url`` (e.g. a local Postgres)
+    is emptied and recreated instead.
+    """
+    if database_url is None:
+        if db_path is None:
+            db_path = os.path.join(tempfile.mkdtemp(prefix="duncare-bench-"), "bench.db")
+        database_url = f"sqlite:///{db_path}"
+    from config import create_app, db
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": database_url})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app, db
+
+
+def reset(db):
+    import cache
+
+    db.drop_all()
+    db.create_all()
+    # cached responses would outlive the dropped tables
+    cache.invalidate(*db.metadata.tables)
+
+
+def populate(db, owners, pets_per_owner=2, treatments=None, meds_per_treatment=2,
+             treatments_per_pet=2, visits_per_pet=2):
+    """Bulk-insert a small, referentially consistent dataset."""
+    from models import Staff, Owner, Pet, Appointment, Treatment, PetTreatment, Medication, Billing
+    import balances
+
+    now = datetime(2025, 1, 1)
+    n_pets = owners * pets_per_owner
+    treatments = treatments if treatments is not None else max(1, n_pets // 2)
+
+    db.session.execute(insert(Staff), [
+        {"id": i, "name": f"Staff {i}", "role": "Veterinarian", "email": f"staff{i}@example.com", "phone": "555-0100"}
+        for i in range(1, 11)
+    ])
+    db.session.execute(insert(Owner), [
+        {"id": i, "name": f"Owner {i}", "email": f"owner{i}@example.com", "phone": "555-0101"}
+        for i in range(1, owners + 1)
+    ])
+    db.session.execute(insert(Pet), [
+        {"id": i, "name": f"Pet {i}", "species": "Dog", "breed": "Beagle", "sex": "Female",
+         "owner_id": (i - 1) // pets_per_owner + 1}
+        for i in range(1, n_pets + 1)
+    ])
+    db.session.execute(insert(Treatment), [
+        {"id": i, "date": now + timedelta(days=i), "description": f"Treatment {i}", "staff_id": i % 10 + 1}
+        for i in range(1, treatments + 1)
+    ])
+    db.session.execute(insert(Medication), [
+        {"name": f"Med {t}.{m}", "dosage": "10 mg", "frequency": "Once daily", "treatment_id": t}
+        for t in range(1, treatments + 1) for m in range(meds_per_treatment)
+    ])
+    db.session.execute(insert(PetTreatment), [
+        {"pet_id": p, "treatment_id": (p + k) % treatments + 1, "treatment_date": now, "notes": "ok"}
+        for p in range(1, n_pets + 1) for k in range(min(treatments_per_pet, treatments))
+    ])
+    db.session.execute(insert(Appointment), [
+        {"date": now + timedelta(hours=p * visits_per_pet + v), "reason": "Checkup", "pet_id": p, "staff_id": p % 10 + 1}
+        for p in range(1, n_pets + 1) for v in range(visits_per_pet)
+    ])
+    db.session.execute(insert(Billing), [
+        {"date": now + timedelta(days=v), "amount": 50.0, "description": "Consultation fee",
+         "paid": bool(v % 2), "pet_id": p}
+        for p in range(1, n_pets + 1) for v in range(visits_per_pet)
+    ])
+    # Core inserts bypass the balance hook
+    balances.rebuild(db.session.connection())
+    db.session.commit()
+
+
+@contextmanager
+def count_queries(engine):
+    """Collect every SQL statement executed on ``engine`` inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,138 @@
+"""Load test: requests/sec and latency of the production server across worker counts.
+
+Builds a SQLite dataset, then for each worker count starts gunicorn with
+gunicorn.conf.py and drives it with keep-alive client threads::
+
+    python -m benchmarks.load_test --workers 1 2 4 --concurrency 16 --duration 10
+
+SQLite serializes writers, so the routes exercised are reads. Point
+--database-url at Postgres to measure a production-like setup.
+"""
+import argparse
+import http.client
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.common import setup_app, populate
+
+ROUTES = [
+    "/api/staff",
+    "/api/owners?limit=50",
+    "/api/pets?limit=50",
+    "/api/appointments?limit=100",
+    "/api/billings?limit=100&paid=false",
+    "/api/treatments?limit=50",
+]
+
+
+def wait_until_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/staff?limit=1")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def drive(port, duration, concurrency):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(offset):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local, failed, i = [], 0, offset
+        while time.monotonic() < stop_at:
+            route = ROUTES[i % len(ROUTES)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                conn.request("GET", route)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0]
+
+
+def run(workers, args, env):
+    env = dict(env, WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(args.threads),
+               PORT=str(args.port), GUNICORN_ACCESS_LOG="/dev/null")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "config:create_app()"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(args.port)
+        drive(args.port, 1, args.concurrency)  # warm up every worker
+        latencies, errors = drive(args.port, args.duration, args.concurrency)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+    latencies.sort()
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "rps": len(latencies) / args.duration,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else None,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else None,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--owners", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=5599)
+    parser.add_argument("--database-url", help="use an existing database instead of a generated SQLite file")
+    args = parser.parse_args()
+
+    env = dict(os.environ, CACHE_BACKEND="none")
+    if args.database_url:
+        env["DATABASE_URL"] = args.database_url
+    else:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="duncare-load-"), "load.db")
+        app, db = setup_app(db_path)
+        with app.app_context():
+            populate(db, args.owners)
+        env["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    print(f"{args.concurrency} clients, {args.threads} threads/worker, {args.duration:.0f}s per run, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for workers in args.workers:
+        result = run(workers, args, env)
+        print(f"{result['workers']:>8}{result['rps']:>10.1f}{result['p50_ms']:>10.1f}"
+              f"{result['p99_ms']:>10.1f}{result['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
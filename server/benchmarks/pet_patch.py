@@ -0,0 +1,116 @@
+"""Benchmark: PATCH /api/pets/<id> on pets with hundreds of treatments.
+
+Compares the diff-based update against the clear-and-reinsert handler it
+replaced, in SQL statements and milliseconds per request, for a rename, a
+resubmitted unchanged treatment list and a list with a few pairs changed::
+
+    python -m benchmarks.pet_patch [--treatments 300] [--repeat 5]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from flask import request
+from sqlalchemy import insert
+
+from benchmarks.common import setup_app, count_queries
+
+
+# The handler this benchmark's subject replaced, kept here as the baseline.
+def legacy_patch(id):
+    from models import db, Pet, PetTreatment
+    from serializers import serialize_pet
+
+    pet = Pet.query.get_or_404(id)
+    data = request.get_json()
+    for field in ["name", "species", "breed", "sex", "color", "medical_notes", "owner_id"]:
+        setattr(pet, field, data.get(field, getattr(pet, field)))
+    pet.pet_treatments.clear()
+    for t in data.get("treatments", []):
+        pt = PetTreatment(
+            pet=pet,
+            treatment_id=t["treatment_id"],
+            treatment_date=datetime.fromisoformat(t["treatment_date"]) if t.get("treatment_date") else None,
+            notes=t.get("notes")
+        )
+        db.session.add(pt)
+    db.session.commit()
+    return serialize_pet(pet), 200
+
+
+def populate_pet(db, treatments):
+    """One pet linked to ``treatments`` treatments; returns its treatment list as sent by clients."""
+    from models import Staff, Owner, Pet, Treatment, PetTreatment
+    import search
+
+    now = datetime(2025, 1, 1)
+    db.session.execute(insert(Staff), [{"id": 1, "name": "Staff 1", "role": "Veterinarian",
+                                        "email": "staff1@example.com", "phone": "555-0100"}])
+    db.session.execute(insert(Owner), [{"id": 1, "name": "Owner 1", "email": "owner1@example.com", "phone": "555-0101"}])
+    db.session.execute(insert(Pet), [{"id": 1, "name": "Rex", "species": "Dog", "breed": "Beagle",
+                                      "sex": "Male", "owner_id": 1}])
+    db.session.execute(insert(Treatment), [
+        {"id": i, "date": now, "description": f"Treatment {i}", "staff_id": 1} for i in range(1, treatments + 11)
+    ])
+    items = [
+        {"treatment_id": i, "treatment_date": (now + timedelta(days=i)).isoformat(), "notes": f"note {i}"}
+        for i in range(1, treatments + 1)
+    ]
+    db.session.execute(insert(PetTreatment), [
+        {"pet_id": 1, "treatment_id": t["treatment_id"],
+         "treatment_date": datetime.fromisoformat(t["treatment_date"]), "notes": t["notes"]}
+        for t in items
+    ])
+    search.rebuild(db.session.connection())
+    db.session.commit()
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--treatments", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app, db = setup_app()
+    with app.app_context():
+        items = populate_pet(db, args.treatments)
+        engine = db.engine
+
+    # drop 5 pairs, add 5 new ones and edit the notes of 5 others
+    changed = [dict(t) for t in items[5:]] + [
+        {"treatment_id": i, "treatment_date": None, "notes": "new"}
+        for i in range(args.treatments + 1, args.treatments + 6)
+    ]
+    for t in changed[:5]:
+        t["notes"] = "edited"
+    bodies = {
+        "rename only": {"name": "Max"},
+        "unchanged treatments": {"name": "Max", "treatments": items},
+        "5 removed, 5 added, 5 edited": {"name": "Max", "treatments": changed},
+    }
+
+    from resources import PetDetail
+
+    def run(handler, body):
+        with app.test_request_context("/api/pets/1", method="PATCH", json=body):
+            response = handler(1)
+            assert response[1] == 200, response[0]
+
+    print(f"pet with {args.treatments} treatments")
+    print(f"{'case':<32}{'handler':>8}{'statements':>12}{'ms':>10}")
+    for case, body in bodies.items():
+        for name, handler in (("legacy", legacy_patch), ("current", PetDetail().patch)):
+            timings = []
+            for _ in range(args.repeat):
+                # every run starts from the original pet
+                run(PetDetail().patch, {"name": "Rex", "treatments": items})
+                with count_queries(engine) as statements:
+                    start = time.perf_counter()
+                    run(handler, body)
+                    timings.append((time.perf_counter() - start) * 1000)
+            print(f"{case:<32}{name:>8}{len(statements):>12}{min(timings):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
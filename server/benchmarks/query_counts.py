@@ -0,0 +1,59 @@
+"""Assert that the number of SQL statements per request does not grow with row count.
+
+Each route is requested against a small and a larger dataset; an N+1 lazy
+load shows up as a statement count that differs between the two. Exits
+non-zero on any regression::
+
+    python -m benchmarks.query_counts
+"""
+import sys
+
+from benchmarks.common import setup_app, reset, populate, count_queries
+
+ROUTES = [
+    "/api/staff",
+    "/api/owners",
+    "/api/pets",
+    "/api/pets?limit=20",
+    "/api/pets/1",
+    "/api/pets/1/profile",
+    "/api/appointments",
+    "/api/treatments",
+    "/api/treatments?limit=20",
+    "/api/medications",
+    "/api/billings",
+]
+SIZES = (5, 50)
+
+
+def measure(app, db, owners):
+    with app.app_context():
+        reset(db)
+        populate(db, owners)
+        engine = db.engine
+    client = app.test_client()
+    counts = {}
+    for route in ROUTES:
+        with count_queries(engine) as statements:
+            response = client.get(route)
+        assert response.status_code == 200, (route, response.status_code)
+        counts[route] = len(statements)
+    return counts
+
+
+def main():
+    app, db = setup_app()
+    results = {size: measure(app, db, size) for size in SIZES}
+
+    failed = False
+    print(f"{'route':<30}" + "".join(f"{f'{s} owners':>12}" for s in SIZES))
+    for route in ROUTES:
+        counts = [results[size][route] for size in SIZES]
+        flag = "" if len(set(counts)) == 1 else "  <-- grows with rows"
+        failed = failed or bool(flag)
+        print(f"{route:<30}" + "".join(f"{c:>12}" for c in counts) + flag)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Micro-benchmark: bytes and ms to serialize 10k rows, before and after the serializers module.
+
+    python -m benchmarks.serialization [--rows 10000] [--repeat 5]
+"""
+import argparse
+import json
+import time
+
+from sqlalchemy import select
+
+from benchmarks.common import setup_app, populate
+
+
+# The hand-written serializer this module replaced, kept here as the baseline.
+def legacy_serialize_billing(b):
+    return {
+        "id": b.id,
+        "date": b.date.isoformat() if b.date else None,
+        "amount": b.amount,
+        "description": b.description,
+        "paid": b.paid,
+        "pet_id": b.pet_id
+    }
+
+
+def best_of(repeat, fn):
+    timings, body = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app, db = setup_app()
+    import serializers
+    from models import Billing
+
+    with app.app_context():
+        # populate() creates 2 billings per pet, 2 pets per owner
+        populate(db, owners=max(1, args.rows // 4))
+
+        def orm_rows():
+            db.session.expunge_all()
+            return Billing.query.order_by(Billing.id).limit(args.rows).all()
+
+        table = Billing.__table__
+        core_select = select(*(table.c[f] for f in serializers.BILLING_FIELDS)).order_by(table.c.id).limit(args.rows)
+
+        def core_rows():
+            return db.session.execute(core_select).all()
+
+        cases = {
+            "legacy: ORM + isoformat + json.dumps": lambda: (
+                json.dumps([legacy_serialize_billing(b) for b in orm_rows()]) + "\n").encode(),
+            "legacy, pretty-printed (indent=2)": lambda: (
+                json.dumps([legacy_serialize_billing(b) for b in orm_rows()], indent=2) + "\n").encode(),
+            "ORM + field serializer + json": lambda: serializers._json_dumps(
+                [serializers.serialize_billing(b) for b in orm_rows()]),
+            "Core rows + json": lambda: serializers._json_dumps(
+                [serializers.serialize_row(r) for r in core_rows()]),
+        }
+        if serializers.orjson is not None:
+            cases["ORM + field serializer + orjson"] = lambda: serializers._orjson_dumps(
+                [serializers.serialize_billing(b) for b in orm_rows()])
+            cases["Core rows + orjson"] = lambda: serializers._orjson_dumps(
+                [serializers.serialize_row(r) for r in core_rows()])
+
+        print(f"{args.rows} billing rows, best of {args.repeat} (includes the SELECT)")
+        print(f"{'case':<40}{'ms':>10}{'bytes':>12}")
+        for name, fn in cases.items():
+            ms, size = best_of(args.repeat, fn)
+            print(f"{name:<40}{ms:>10.1f}{size:>12}")
+
+
+if __name__ == "__main__":
+    main()
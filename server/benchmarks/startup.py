@@ -0,0 +1,84 @@
+"""Cold-start benchmark: time to import and build the production app.
+
+Runs ``from config import create_app; create_app()`` in fresh interpreters
+under ``python -X importtime`` and reports the median wall time and the
+heaviest imported packages::
+
+    python -m benchmarks.startup [--runs 5] [--save LABEL]
+
+``--save`` records the result under LABEL in benchmarks/results/startup.json,
+which is tracked in the repo so changes to cold-start time show up in review.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RESULTS = os.path.join(os.path.dirname(__file__), "results", "startup.json")
+SNIPPET = (
+    "import time; start = time.perf_counter(); "
+    "from config import create_app; create_app(); "
+    "print((time.perf_counter() - start) * 1000)"
+)
+
+
+def package_imports(stderr):
+    """Return {package: cumulative_us} for every top-level package imported."""
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if "." in name or name.startswith("_"):
+            continue
+        totals[name] = max(totals.get(name, 0), int(cumulative))
+    return totals
+
+
+def measure(runs):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tempfile.mkdtemp()}/startup.db")
+    walls, imports = [], {}
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-W", "ignore", "-c", SNIPPET],
+                              env=env, capture_output=True, text=True, check=True)
+        walls.append(float(proc.stdout.strip().splitlines()[-1]))
+        for name, us in package_imports(proc.stderr).items():
+            imports.setdefault(name, []).append(us)
+    top = sorted(((name, statistics.median(us) / 1000) for name, us in imports.items()),
+                 key=lambda item: item[1], reverse=True)[:10]
+    return {
+        "runs": runs,
+        "python": sys.version.split()[0],
+        "wall_ms": round(statistics.median(walls), 1),
+        "top_imports_ms": {name: round(ms, 1) for name, ms in top},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--save", metavar="LABEL")
+    args = parser.parse_args()
+
+    result = measure(args.runs)
+    print(f"create_app() cold start: {result['wall_ms']} ms (median of {args.runs})")
+    for name, ms in result["top_imports_ms"].items():
+        print(f"  {name:<30}{ms:>8.1f} ms")
+
+    if args.save:
+        saved = {}
+        if os.path.exists(RESULTS):
+            with open(RESULTS) as f:
+                saved = json.load(f)
+        saved[args.save] = result
+        with open(RESULTS, "w") as f:
+            json.dump(saved, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
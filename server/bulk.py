@@ -0,0 +1,290 @@
+"""Bulk creation of pets, appointments, billings and medications.
+
+Rows are validated in one pass (including foreign keys, checked with one
+``IN`` query per referenced table) and, only if every row is valid, inserted
+with executemany inside a single transaction. Input is either a JSON array
+or NDJSON (one object per line).
+
+Appointments are also checked for double bookings, as ``POST
+/api/appointments`` does: the booking lock of every staff member in the
+batch is taken (in id order, so concurrent imports cannot deadlock) and held
+until the insert commits, then each row is checked against that staff
+member's existing appointments, read with one range query per staff member,
+and against the other rows of the batch.
+"""
+import json
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from config import db
+from models import Owner, Pet, Appointment, Treatment, Medication, Billing, Staff, APPOINTMENT_MAX_DURATION
+import balances
+import cache
+import changes
+import scheduling
+import search
+import versions
+
+MAX_BULK_ROWS = 50000
+INSERT_CHUNK_SIZE = 1000
+FK_CHUNK_SIZE = 500
+
+
+def _string(value):
+    if not isinstance(value, str):
+        raise ValueError("must be a string")
+    return value
+
+
+def _integer(value):
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError("must be an integer")
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError("must be an integer")
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError("must be a number")
+    return float(value)
+
+
+def _boolean(value):
+    if not isinstance(value, bool):
+        raise ValueError("must be true or false")
+    return value
+
+
+def _datetime(value):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError("must be an ISO 8601 date")
+
+
+# field -> (parser, required)
+SCHEMAS = {
+    Pet: {
+        "name": (_string, True),
+        "species": (_string, False),
+        "breed": (_string, False),
+        "sex": (_string, False),
+        "color": (_string, False),
+        "dob": (_datetime, False),
+        "medical_notes": (_string, False),
+        "owner_id": (_integer, False),
+    },
+    Appointment: {
+        "date": (_datetime, False),
+        "end_date": (_datetime, False),
+        "reason": (_string, False),
+        "pet_id": (_integer, False),
+        "staff_id": (_integer, False),
+    },
+    Billing: {
+        "pet_id": (_integer, True),
+        "date": (_datetime, False),
+        "amount": (_number, True),
+        "description": (_string, True),
+        "paid": (_boolean, False),
+    },
+    Medication: {
+        "name": (_string, False),
+        "dosage": (_string, False),
+        "frequency": (_string, False),
+        "treatment_id": (_integer, False),
+    },
+}
+
+FOREIGN_KEYS = {
+    "owner_id": Owner,
+    "pet_id": Pet,
+    "staff_id": Staff,
+    "treatment_id": Treatment,
+}
+
+DEFAULTS = {
+    Billing: {"paid": False},
+}
+
+# model -> (field, derive): derive(parsed row, raw row) returns the field's
+# value, checked against the other fields; raises ValueError
+DERIVED = {
+    Appointment: ("end_date", lambda mapping, row: scheduling.appointment_end(mapping.get("date"), row)),
+}
+
+
+def parse_payload(request):
+    """Return a list of (raw_row or None, parse_error or None) from a JSON array or NDJSON body."""
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        rows = []
+        for line in request.stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append((json.loads(line), None))
+            except ValueError as e:
+                rows.append((None, f"invalid JSON: {e}"))
+        return rows
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        raise ValueError("expected a JSON array or an application/x-ndjson body")
+    return [(row, None) for row in data]
+
+
+def validate(model, payload):
+    """Validate rows for ``model``; returns (mappings, errors) where errors are per-row dicts."""
+    schema = SCHEMAS[model]
+    defaults = DEFAULTS.get(model, {})
+    mappings, errors = [], []
+
+    for index, (row, error) in enumerate(payload):
+        if error is None and not isinstance(row, dict):
+            error = "must be an object"
+        if error is not None:
+            errors.append({"index": index, "error": error})
+            continue
+
+        mapping, row_errors = dict(defaults), {}
+        for field in row.keys() - schema.keys():
+            row_errors[field] = "unknown field"
+        for field, (parser, required) in schema.items():
+            value = row.get(field)
+            if value is None:
+                if required:
+                    row_errors[field] = "is required"
+                continue
+            try:
+                mapping[field] = parser(value)
+            except ValueError as e:
+                row_errors[field] = str(e)
+        if not row_errors and model in DERIVED:
+            field, derive = DERIVED[model]
+            try:
+                mapping[field] = derive(mapping, row)
+            except ValueError as e:
+                row_errors[field] = str(e)
+
+        if row_errors:
+            errors.append({"index": index, "errors": row_errors})
+        else:
+            mappings.append((index, mapping))
+
+    errors.extend(_missing_references(mappings))
+    if model in CONFLICT_CHECKS:
+        failed = {e["index"] for e in errors}
+        errors.extend(CONFLICT_CHECKS[model]([(i, m) for i, m in mappings if i not in failed]))
+    errors.sort(key=lambda e: e["index"])
+    return [mapping for _, mapping in mappings], errors
+
+
+def _missing_references(indexed_mappings):
+    errors = []
+    for field, target in FOREIGN_KEYS.items():
+        wanted = {m[field] for _, m in indexed_mappings if m.get(field) is not None}
+        if not wanted:
+            continue
+        found = set()
+        wanted_list = list(wanted)
+        for start in range(0, len(wanted_list), FK_CHUNK_SIZE):
+            chunk = wanted_list[start:start + FK_CHUNK_SIZE]
+            found.update(db.session.execute(select(target.id).where(target.id.in_(chunk))).scalars())
+        for index, m in indexed_mappings:
+            if m.get(field) is not None and m[field] not in found:
+                errors.append({"index": index, "errors": {field: f"{target.__tablename__} {m[field]} does not exist"}})
+    return errors
+
+
+def _overlapping(booked, starts, start, end):
+    """The entries of ``booked`` (sorted by ``starts``) that overlap ``[start, end)``."""
+    # nothing lasts longer than APPOINTMENT_MAX_DURATION, as in scheduling._overlapping
+    lo = bisect_right(starts, start - APPOINTMENT_MAX_DURATION)
+    hi = bisect_left(starts, end)
+    return [b for b in booked[lo:hi] if b["end_date"] > start]
+
+
+def _booking_conflicts(indexed_mappings):
+    """Per-row errors for appointments that double-book their staff member."""
+    by_staff = {}
+    for index, m in indexed_mappings:
+        if m.get("staff_id") is not None and m.get("date") is not None:
+            by_staff.setdefault(m["staff_id"], []).append(
+                {"index": index, "date": m["date"], "end_date": m["end_date"]}
+            )
+    errors = []
+    for staff_id in sorted(by_staff):
+        rows = sorted(by_staff[staff_id], key=lambda r: (r["date"], r["index"]))
+        scheduling.lock_staff(db.session, staff_id)
+        booked = scheduling.conflicts(
+            db.session.connection(), staff_id, rows[0]["date"], max(r["end_date"] for r in rows)
+        )
+        booked_starts, row_starts = [b["date"] for b in booked], [r["date"] for r in rows]
+        for row in rows:
+            clashes = _overlapping(booked, booked_starts, row["date"], row["end_date"]) + [
+                r for r in _overlapping(rows, row_starts, row["date"], row["end_date"]) if r is not row
+            ]
+            if clashes:
+                errors.append({
+                    "index": row["index"],
+                    "errors": {"date": f"staff {staff_id} is already booked at that time"},
+                    "conflicts": clashes,
+                })
+    return errors
+
+
+# model -> check(indexed mappings) returning per-row errors; runs on rows
+# that passed every other check
+CONFLICT_CHECKS = {
+    Appointment: _booking_conflicts,
+}
+
+
+def insert_rows(model, mappings):
+    """Insert ``mappings`` with executemany in the current transaction; returns the new ids in order."""
+    ids = []
+    for start in range(0, len(mappings), INSERT_CHUNK_SIZE):
+        chunk = mappings[start:start + INSERT_CHUNK_SIZE]
+        result = db.session.execute(
+            insert(model).returning(model.id, sort_by_parameter_order=True), chunk
+        )
+        ids.extend(result.scalars())
+    # Core inserts bypass the ORM flush hooks
+    versions.bump(db.session.connection(), [model.__tablename__])
+    cache.invalidate_on_commit(db.session, model.__tablename__)
+    changes.record(db.session, model.__tablename__, ids)
+    if model is Pet:
+        search.reindex(db.session.connection(), "pet", ids)
+    if model is Billing:
+        deltas = {}
+        for m in mappings:
+            balances.add_delta(deltas, m["pet_id"], balances.billing_delta(m["amount"], m["paid"]))
+        balances.apply(db.session.connection(), deltas)
+    return ids
+
+
+def bulk_create(model, payload, commit=True):
+    """Validate and insert ``payload``; returns (response body, status code).
+
+    With ``commit=False`` the rows are left in the open transaction, for a
+    caller that commits them together with its own writes (jobs.py).
+    """
+    if len(payload) > MAX_BULK_ROWS:
+        return {"error": f"at most {MAX_BULK_ROWS} rows per request"}, 413
+    mappings, errors = validate(model, payload)
+    if errors:
+        db.session.rollback()  # releases the booking locks
+        return {"error": "validation failed, nothing was inserted", "errors": errors}, 400
+    try:
+        ids = insert_rows(model, mappings)
+        if commit:
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return {"error": str(e)}, 400
+    return {"created": len(ids), "ids": ids}, 201
@@ -0,0 +1,196 @@
+"""Response cache for rarely-changing list endpoints.
+
+Whole GET responses (body and headers, including the ETag) are cached per
+table and request path. A hit answers the request, or its If-None-Match,
+after a single primary-key read: the stored ETag is compared with the
+current ``table_versions`` (see versions.py), so an entry is never served
+once any worker has committed a write to its tables.
+
+Entries are invalidated per table:
+
+- explicitly by the write handlers (``invalidate``), and
+- by an ``after_commit`` session hook for every table a committed flush
+  wrote to, which also covers cascades and other write paths.
+
+Backends, chosen with ``CACHE_BACKEND``:
+
+- ``memory`` (default): per-process LRU bounded by ``CACHE_MAX_ENTRIES`` with
+  a ``CACHE_TTL`` (seconds). Other workers' commits are caught by the
+  version check on every hit.
+- ``redis``: shared across workers at ``CACHE_URL`` (any Redis-compatible
+  server); invalidation bumps a per-table generation key.
+- ``none``: caching disabled.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config import db
+import serializers
+import versions
+
+# --- Backends ---
+# Each backend keeps a generation number per table. Readers take the
+# generation before running the query and store under it, so a result
+# computed while an invalidation happened is never served.
+class MemoryCache:
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (table, key) -> (generation, expires_at, value)
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def generation(self, table):
+        return self._generations.get(table, 0)
+
+    def get(self, table, generation, key):
+        with self._lock:
+            entry = self._entries.get((table, key))
+            if entry is None or entry[0] != generation or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[(table, key)]
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end((table, key))
+            self.stats["hits"] += 1
+            return entry[2]
+
+    def set(self, table, generation, key, value):
+        with self._lock:
+            if generation != self.generation(table):
+                return
+            self._entries[(table, key)] = (generation, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end((table, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def invalidate(self, table):
+        with self._lock:
+            self._generations[table] = self.generation(table) + 1
+            for entry_key in [k for k in self._entries if k[0] == table]:
+                del self._entries[entry_key]
+            self.stats["invalidations"] += 1
+
+    def info(self):
+        return {"backend": "memory", "entries": len(self._entries), **self.stats}
+
+
+class RedisCache:
+    prefix = "duncare:cache"
+
+    def __init__(self, url, ttl=300):
+        import redis  # optional dependency, only needed for this backend
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def generation(self, table):
+        return int(self.client.get(f"{self.prefix}:gen:{table}") or 0)
+
+    def get(self, table, generation, key):
+        raw = self.client.get(f"{self.prefix}:{table}:{generation}:{key}")
+        if raw is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return serializers.loads(raw)
+
+    def set(self, table, generation, key, value):
+        # a stale generation writes a key nobody reads; it expires with its TTL
+        self.client.set(f"{self.prefix}:{table}:{generation}:{key}", serializers.dumps(value), ex=self.ttl)
+
+    def invalidate(self, table):
+        self.client.incr(f"{self.prefix}:gen:{table}")
+        self.stats["invalidations"] += 1
+
+    def info(self):
+        return {"backend": "redis", **self.stats}
+
+
+# responses with more rows than this are not cached, which bounds memory
+# at roughly CACHE_MAX_ENTRIES * CACHE_MAX_ROWS rows
+MAX_ROWS = int(os.getenv("CACHE_MAX_ROWS", "5000"))
+
+def make_backend():
+    backend = os.getenv("CACHE_BACKEND", "memory")
+    ttl = int(os.getenv("CACHE_TTL", "300"))
+    if backend == "memory":
+        return MemoryCache(max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "1024")), ttl=ttl)
+    if backend == "redis":
+        return RedisCache(os.getenv("CACHE_URL", "redis://localhost:6379/0"), ttl=ttl)
+    if backend == "none":
+        return None
+    raise RuntimeError("CACHE_BACKEND must be one of memory, redis, none")
+
+backend = make_backend()
+
+def invalidate(*tables):
+    if backend is not None:
+        for table in tables:
+            backend.invalidate(table)
+
+def stats():
+    return backend.info() if backend is not None else {"backend": "none"}
+
+
+# --- Responses ---
+def cached_response(table, produce, etag_tables=None):
+    """Serve a GET for ``table`` from the cache, calling ``produce()`` on a miss.
+
+    ``produce`` returns a Flask-RESTful (body, status, headers) tuple or a
+    Response; only 200 tuples are stored. ``etag_tables`` are the tables
+    its ETag is built from (default: ``table``); an entry whose ETag no
+    longer matches their versions counts as a miss.
+    """
+    if backend is None:
+        return produce()
+    key = request.full_path
+    generation = backend.generation(table)
+    entry = backend.get(table, generation, key)
+    if entry is not None:
+        etag = entry["headers"].get("ETag")
+        if etag != f'W/"{versions.etag_for(db.session.connection(), etag_tables or (table,))}"':
+            # written by another worker since; this worker's entries for the table are stale
+            backend.invalidate(table)
+            generation = backend.generation(table)
+            entry = None
+    if entry is None:
+        result = produce()
+        if isinstance(result, tuple) and result[1] == 200 and len(result[0]) <= MAX_ROWS:
+            backend.set(table, generation, key, {"body": result[0], "headers": result[2] if len(result) > 2 else {}})
+        return result
+
+    headers = entry["headers"]
+    etag = headers.get("ETag")
+    if etag and request.if_none_match.contains_weak(etag[3:-1]):
+        response = Response(status=304)
+        response.headers.update(headers)
+        return response
+    return entry["body"], 200, headers
+
+
+# --- Invalidation on commit ---
+def invalidate_on_commit(session, *tables):
+    """Invalidate ``tables`` once ``session`` commits; for writes that bypass the flush."""
+    session.info.setdefault("cache_written_tables", set()).update(tables)
+
+@event.listens_for(Session, "after_flush")
+def remember_written_tables(session, flush_context):
+    session.info.setdefault("cache_written_tables", set()).update(versions.written_tables(session))
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed_tables(session):
+    invalidate(*session.info.pop("cache_written_tables", ()))
+
+@event.listens_for(Session, "after_rollback")
+def forget_written_tables(session):
+    session.info.pop("cache_written_tables", None)
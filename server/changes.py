@@ -0,0 +1,209 @@
+"""Change feed: a log of every insert, update and delete of clinic rows.
+
+Each written row appends a ``changes`` row with a monotonically increasing
+``seq``. Clients keep the last seq they applied and poll
+``GET /api/changes?since=<seq>`` for what happened after it, instead of
+downloading whole tables again. Deletes are recorded as tombstones.
+
+Entries are collected from the unit of work on every flush and written
+just before the transaction commits. That write first takes the row lock
+on the ``changes`` table version. The lock is held until commit, so
+concurrent writers allocate seqs in commit order, and a reader never sees
+a seq while an earlier one is still uncommitted. It is the last lock a
+transaction takes, so it cannot deadlock with the per-table version locks.
+
+Writes that bypass the unit of work (Core inserts) must call ``record``.
+``flask changes purge`` trims old entries; a client whose ``since`` is
+older than the oldest kept entry gets a 410 and must download everything
+again. So must a client that reads a ``reset`` entry, which ``seed.py``
+writes after replacing the data.
+"""
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import delete, event, func, insert, inspect, select, tuple_
+from sqlalchemy.orm import Session, object_session
+
+from config import db
+from models import Change, Staff, Owner, Pet, Appointment, Treatment, PetTreatment, Medication, Billing
+from serializers import (
+    STAFF_FIELDS, OWNER_FIELDS, PET_FIELDS, APPOINTMENT_FIELDS, TREATMENT_FIELDS, PET_TREATMENT_FIELDS,
+    MEDICATION_FIELDS, BILLING_FIELDS,
+)
+import versions
+
+# Tracked models and the fields sent with their changes, by table name
+TRACKED = {
+    model.__tablename__: (model, fields) for model, fields in (
+        (Staff, STAFF_FIELDS),
+        (Owner, OWNER_FIELDS),
+        (Pet, PET_FIELDS),
+        (Appointment, APPOINTMENT_FIELDS),
+        (Treatment, TREATMENT_FIELDS),
+        (PetTreatment, PET_TREATMENT_FIELDS),
+        (Medication, MEDICATION_FIELDS),
+        (Billing, BILLING_FIELDS),
+    )
+}
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+
+
+class ChangesGone(Exception):
+    """Entries after the client's seq were purged; it has to resynchronize."""
+
+
+def row_id(values):
+    return ",".join(str(v) for v in values)
+
+
+def _parse_row_id(value):
+    parts = [int(v) for v in value.split(",")]
+    return parts[0] if len(parts) == 1 else parts
+
+
+# --- Recording ---
+def record(session, table, ids, op="upsert"):
+    """Queue changes to ``table`` rows (ids, or key tuples for pet_treatments) for the current transaction."""
+    pending = session.info.setdefault("pending_changes", [])
+    pending.extend((table, row_id(i if isinstance(i, tuple) else (i,)), op) for i in ids)
+
+
+def collect_delete(mapper, connection, obj):
+    # session.deleted misses rows removed by delete-orphan cascades (they
+    # stay in session.dirty), so deletes are taken from the mapper event
+    object_session(obj).info.setdefault("flush_deleted", []).append(obj)
+
+
+for _model, _ in TRACKED.values():
+    event.listen(_model, "after_delete", collect_delete)
+
+
+@event.listens_for(Session, "after_flush")
+def collect_changes(session, flush_context):
+    pending = session.info.setdefault("pending_changes", [])
+    deleted = session.info.pop("flush_deleted", [])
+    deleted_ids = {id(obj) for obj in deleted}
+    modified = [obj for obj in session.dirty if id(obj) not in deleted_ids and session.is_modified(obj)]
+    for objects, op in ((deleted, "delete"), (session.new, "upsert"), (modified, "upsert")):
+        for obj in objects:
+            table = getattr(obj, "__tablename__", None)
+            if table not in TRACKED:
+                continue
+            state = inspect(obj)
+            # new rows get their identity only after this hook
+            pending.append((table, row_id(state.identity or state.mapper.primary_key_from_instance(obj)), op))
+
+
+@event.listens_for(Session, "before_commit")
+def write_changes(session):
+    # flush first: the commit's own flush would only collect entries after this point
+    session.flush()
+    pending = session.info.pop("pending_changes", None)
+    if not pending:
+        return
+    conn = session.connection()
+    versions.bump(conn, [Change.__tablename__])
+    now = datetime.utcnow()
+    conn.execute(insert(Change), [
+        {"table_name": table, "row_id": key, "op": op, "changed_at": now} for table, key, op in pending
+    ])
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_changes(session):
+    session.info.pop("pending_changes", None)
+    session.info.pop("flush_deleted", None)
+
+
+def reset(conn):
+    """Drop the whole log and leave a single ``reset`` entry (after bulk-replacing the data)."""
+    conn.execute(delete(Change))
+    versions.bump(conn, [Change.__tablename__])
+    conn.execute(insert(Change).values(table_name="*", row_id="0", op="reset"))
+
+
+# --- Reading ---
+def latest_seq(conn):
+    return conn.execute(select(func.max(Change.seq))).scalar() or 0
+
+
+def _current_rows(conn, table, keys):
+    """{row_id: data} for the ``keys`` of ``table`` that still exist, in one query."""
+    model, fields = TRACKED[table]
+    primary_key = list(model.__table__.primary_key.columns)
+    query = select(*(model.__table__.c[f] for f in fields), *primary_key)
+    if len(primary_key) == 1:
+        query = query.where(primary_key[0].in_([_parse_row_id(k) for k in keys]))
+    else:
+        query = query.where(tuple_(*primary_key).in_([tuple(_parse_row_id(k)) for k in keys]))
+    rows = {}
+    for row in conn.execute(query):
+        values = row._mapping
+        rows[row_id(values[c] for c in primary_key)] = {f: values[f] for f in fields}
+    return rows
+
+
+def feed(conn, since, limit=DEFAULT_LIMIT):
+    """Changes after ``since``, at most ``limit`` log entries; raises ChangesGone.
+
+    Several entries for one row are collapsed into the last one, which for
+    inserts and updates carries the row's current data (``null`` if it has
+    been deleted since; its tombstone follows). ``next`` is the ``since``
+    for the following call, and ``more`` says whether to make it right away.
+    """
+    oldest = conn.execute(select(func.min(Change.seq))).scalar()
+    if oldest is not None and since < oldest - 1:
+        raise ChangesGone(f"changes before {oldest} were purged; download everything again")
+
+    entries = conn.execute(
+        select(Change.seq, Change.table_name, Change.row_id, Change.op, Change.changed_at)
+        .where(Change.seq > since)
+        .order_by(Change.seq)
+        .limit(limit)
+    ).all()
+    latest = {}
+    for entry in entries:
+        latest.pop((entry.table_name, entry.row_id), None)
+        latest[(entry.table_name, entry.row_id)] = entry
+
+    upserted = {}
+    for (table, key), entry in latest.items():
+        if entry.op == "upsert":
+            upserted.setdefault(table, []).append(key)
+    data = {table: _current_rows(conn, table, keys) for table, keys in upserted.items()}
+
+    changes = [
+        {
+            "seq": entry.seq,
+            "table": entry.table_name,
+            "op": entry.op,
+            "id": _parse_row_id(entry.row_id),
+            "at": entry.changed_at,
+            "data": data[entry.table_name].get(entry.row_id) if entry.op == "upsert" else None,
+        }
+        for entry in latest.values()
+    ]
+    return {
+        "changes": changes,
+        "next": entries[-1].seq if entries else max(since, 0),
+        "more": len(entries) == limit,
+    }
+
+
+# --- CLI ---
+changes_cli = AppGroup("changes", help="Manage the change feed.")
+
+
+@changes_cli.command("purge")
+@click.option("--days", default=30, show_default=True, help="Delete entries older than this.")
+def purge_command(days):
+    """Delete old change feed entries (the newest one is always kept)."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    newest = select(func.max(Change.seq)).scalar_subquery()
+    deleted = db.session.execute(
+        delete(Change).where(Change.changed_at < cutoff, Change.seq < newest)
+    ).rowcount
+    db.session.commit()
+    click.echo(f"Deleted {deleted} change feed entries.")
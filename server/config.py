@@ -1,24 +1,105 @@
 import os
+
+import click
 from flask import Flask
 from flask_cors import CORS
-from flask_migrate import Migrate
 from flask_restful import Api
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import MetaData
 
-# Instantiate app
-app = Flask(__name__)
-
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///app.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.json.compact = False
+import serializers
 
 metadata = MetaData(naming_convention={
+    "ix": "ix_%(column_0_label)s",
     "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
 })
 db = SQLAlchemy(metadata=metadata)
-db.init_app(app)
-migrate = Migrate(app, db)
-api = Api(app)
 
-CORS(app)
+CORS_EXPOSE_HEADERS = ["X-Next-Cursor", "Link", "ETag", "Server-Timing"]
+
+
+def engine_options(url):
+    """SQLAlchemy engine options from DB_* environment variables."""
+    options = {
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    }
+    statement_timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    if url.startswith("postgres"):
+        # keep at least one connection per gunicorn thread
+        options["pool_size"] = int(os.getenv("DB_POOL_SIZE", os.getenv("GUNICORN_THREADS", "4")))
+        options["max_overflow"] = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+        options["pool_timeout"] = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+        options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout_ms}"}
+    elif url.startswith("sqlite"):
+        # SQLite has no statement timeout; bound the wait for a write lock instead
+        options["connect_args"] = {"timeout": statement_timeout_ms / 1000}
+    return options
+
+
+def database_url():
+    url = os.getenv('DATABASE_URL', 'sqlite:///app.db')
+    if url.startswith("postgres://"):
+        # Render and Heroku hand out postgres:// URLs, which SQLAlchemy 2 rejects
+        url = url.replace("postgres://", "postgresql://", 1)
+    return url
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # the full-text search tables are managed by search.py, not by the models
+    return not (type_ == "table" and name.startswith(("search_index", "search_documents")))
+
+
+def create_app(config=None):
+    """Build the Flask app; ``config`` is a dict overriding the environment defaults.
+
+    Production entry point: ``gunicorn -c gunicorn.conf.py 'config:create_app()'``.
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url()
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['INSTRUMENTATION'] = os.getenv("INSTRUMENTATION", "false").lower() == "true"
+    app.config.update(config or {})
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+
+    db.init_app(app)
+    api = Api(app)
+    serializers.init_app(app, api)
+    if app.config['INSTRUMENTATION']:
+        import metrics
+        metrics.init_app(app, api)
+
+    CORS(app)
+    CORS(app, resources={r"/api/*": {"origins": api_origins()}}, supports_credentials=api_origins() != "*",
+         expose_headers=CORS_EXPOSE_HEADERS)
+
+    if click.get_current_context(silent=True) is not None:
+        # Only the flask CLI (`flask db ...`) needs Flask-Migrate, and it pulls
+        # in Alembic, so web workers skip it.
+        from flask_migrate import Migrate
+        Migrate(app, db, include_object=include_object)
+
+    # Imported here rather than at module level: the resources pull in the
+    # models and register the ORM event hooks, none of which config needs.
+    import resources
+    resources.register(app, api)
+    return app
+
+
+def api_origins():
+    """Origins allowed to call /api from a browser: ``"*"``, or a list in production."""
+    if os.getenv("FLASK_ENV", "development") == "production":
+        return ["https://duncare.onrender.com"]
+    return "*"
+
+
+def create_asgi_app():
+    """ASGI entry point for uvicorn: ``uvicorn --factory config:create_asgi_app``.
+
+    Needs the optional ``asgiref`` package. ``/api/stream`` is served on the
+    event loop rather than in the WSGI thread pool (see events.py).
+    """
+    from asgiref.wsgi import WsgiToAsgi
+    import events
+    app = create_app()
+    return events.asgi_stream(WsgiToAsgi(app), app, api_origins())
@@ -0,0 +1,311 @@
+"""Server-sent events: new appointments and billing changes pushed to clients.
+
+``GET /api/stream`` is an ``text/event-stream`` that receives
+``appointment.created``, ``billing.created`` and ``billing.updated`` events
+as the write handlers commit them, so front-desk pages need not poll the
+list endpoints. ``?types=`` limits the stream to some event types, and a
+reconnecting ``EventSource`` resumes after its ``Last-Event-ID`` as long as
+the event is still buffered (the last ``EVENTS_BUFFER`` events).
+
+Backends, chosen with ``EVENTS_BACKEND``:
+
+- ``memory`` (default for a single process): events fan out to the streams
+  of the process that published them.
+- ``database`` (default under gunicorn with more than one worker, see
+  gunicorn.conf.py): events are inserted into the ``events`` table and one
+  thread per process polls it every ``EVENTS_POLL_INTERVAL`` seconds, so
+  every worker sees every event. Needs no extra server, so it also runs
+  locally on SQLite. ``flask events purge`` deletes old rows.
+
+Each insert first takes the row lock on the ``events`` table version and
+holds it until commit, as changes.py does for seqs, so ids become visible
+in order and the poller's ``id > last_id`` never skips an event that
+committed late.
+
+Under gunicorn each open stream holds a worker thread, so a worker serves
+at most ``EVENTS_MAX_STREAMS`` streams (half its threads by default) and
+answers further ones with a 503. Under uvicorn (``config:create_asgi_app``)
+streams are served by ``asgi_stream`` on the event loop instead, so idle
+connections cost no thread and are not capped.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timedelta
+from urllib.parse import parse_qsl
+
+import click
+from flask import Response, current_app, request
+from flask.cli import AppGroup
+from sqlalchemy import delete, func, insert, select
+
+from config import db
+from models import Event
+from serializers import dumps
+import versions
+
+TYPES = ("appointment.created", "billing.created", "billing.updated")
+KEEPALIVE = float(os.getenv("EVENTS_KEEPALIVE", "15"))
+BUFFER = int(os.getenv("EVENTS_BUFFER", "1000"))
+POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", "1.0"))
+# open WSGI streams per worker; the rest of its threads stay free for requests
+MAX_STREAMS = int(os.getenv("EVENTS_MAX_STREAMS") or max(1, int(os.getenv("GUNICORN_THREADS", "4")) // 2))
+# how long a disconnected EventSource waits before reconnecting, in ms
+RETRY_MS = 3000
+
+StreamEvent = namedtuple("StreamEvent", "id type data")
+
+
+# --- Fan-out ---
+class LocalFanout:
+    """Recent events of this process, and wake-ups for the streams waiting on them."""
+
+    def __init__(self, buffer=BUFFER):
+        self.events = deque(maxlen=buffer)
+        self.last_id = 0
+        self._condition = threading.Condition()
+        self._async_waiters = set()  # (loop, asyncio.Event)
+
+    def dispatch(self, event_id, type, data):
+        with self._condition:
+            self.events.append(StreamEvent(event_id, type, data))
+            self.last_id = event_id
+            self._condition.notify_all()
+            waiters = list(self._async_waiters)
+        for loop, woken in waiters:
+            loop.call_soon_threadsafe(woken.set)
+
+    def after(self, last_id, types=None):
+        """(buffered events after ``last_id`` of ``types``, the id to continue from)."""
+        with self._condition:
+            events = [e for e in self.events if e.id > last_id and (types is None or e.type in types)]
+            return events, max(last_id, self.last_id)
+
+    def wait(self, last_id, timeout):
+        """Block until an event after ``last_id`` arrives or ``timeout`` passes."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.last_id > last_id, timeout)
+
+    async def wait_async(self, last_id, timeout):
+        woken = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), woken)
+        with self._condition:
+            if self.last_id > last_id:
+                return
+            self._async_waiters.add(waiter)
+        try:
+            await asyncio.wait_for(woken.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condition:
+                self._async_waiters.discard(waiter)
+
+
+class MemoryBroker(LocalFanout):
+    name = "memory"
+
+    def start(self, app):
+        pass
+
+    def publish(self, type, data):
+        data = dumps(data).decode()
+        with self._condition:
+            self.dispatch(self.last_id + 1, type, data)
+
+
+class DatabaseBroker(LocalFanout):
+    """Publishes into the ``events`` table; a poller thread per process dispatches new rows."""
+    name = "database"
+
+    def __init__(self, interval=POLL_INTERVAL, **kwargs):
+        super().__init__(**kwargs)
+        self.interval = interval
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def start(self, app):
+        with self._start_lock:
+            if self._started:
+                return
+            with app.app_context():
+                self.last_id = db.session.execute(select(func.max(Event.id))).scalar() or 0
+                db.session.remove()
+            threading.Thread(target=self._poll, args=(app,), name="events-poller", daemon=True).start()
+            self._started = True
+
+    def publish(self, type, data):
+        conn = db.session.connection()
+        # held until commit, so concurrent publishers commit ids in order
+        versions.bump(conn, [Event.__tablename__])
+        conn.execute(insert(Event).values(type=type, data=dumps(data).decode()))
+        db.session.commit()
+
+    def _poll(self, app):
+        while True:
+            try:
+                with app.app_context():
+                    rows = db.session.execute(
+                        select(Event.id, Event.type, Event.data)
+                        .where(Event.id > self.last_id)
+                        .order_by(Event.id)
+                        .limit(500)
+                    ).all()
+                    db.session.remove()
+                for row in rows:
+                    self.dispatch(row.id, row.type, row.data)
+            except Exception:
+                app.logger.exception("polling events failed")
+            time.sleep(self.interval)
+
+
+def make_broker():
+    backend = os.getenv("EVENTS_BACKEND", "memory")
+    if backend == "memory":
+        return MemoryBroker()
+    if backend == "database":
+        return DatabaseBroker()
+    raise RuntimeError("EVENTS_BACKEND must be memory or database")
+
+
+broker = make_broker()
+
+
+def publish(type, data):
+    """Send an event to every open stream; call after the write it describes has committed."""
+    try:
+        broker.publish(type, data)
+    except Exception:
+        # the write already committed; a lost event must not turn it into an error
+        db.session.rollback()
+        current_app.logger.exception("publishing %s event failed", type)
+
+
+# --- Streams ---
+def parse_stream_args(args, headers):
+    """(last event id, types) for a stream request; raises ValueError."""
+    last_id = headers.get("Last-Event-ID") or args.get("last_event_id")
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        raise ValueError("Last-Event-ID must be an integer")
+    types = args.get("types")
+    types = tuple(types.split(",")) if types else None
+    for type in types or ():
+        if type not in TYPES:
+            raise ValueError(f"types must be among {', '.join(TYPES)}")
+    return last_id, types
+
+
+def format_event(event):
+    return f"id: {event.id}\nevent: {event.type}\ndata: {event.data}\n\n".encode()
+
+
+STREAM_HEADERS = {
+    "Cache-Control": "no-cache",
+    # keep nginx and similar proxies from buffering the stream
+    "X-Accel-Buffering": "no",
+}
+
+
+_stream_slots = threading.BoundedSemaphore(MAX_STREAMS)
+
+
+def stream_response(app):
+    """The WSGI response for ``GET /api/stream``; holds a thread while open."""
+    try:
+        last_id, types = parse_stream_args(request.args, request.headers)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    if not _stream_slots.acquire(blocking=False):
+        return {"error": "too many open streams, retry later"}, 503, {"Retry-After": str(RETRY_MS // 1000)}
+    try:
+        broker.start(app)
+    except Exception:
+        _stream_slots.release()
+        raise
+    if last_id is None:
+        last_id = broker.last_id
+
+    def generate():
+        nonlocal last_id
+        yield f"retry: {RETRY_MS}\n\n".encode()
+        while True:
+            broker.wait(last_id, KEEPALIVE)
+            events, last_id = broker.after(last_id, types)
+            yield b"".join(format_event(e) for e in events) or b": keepalive\n\n"
+
+    response = Response(generate(), mimetype="text/event-stream", headers=STREAM_HEADERS)
+    # the server closes the response when the client goes away, started or not
+    response.call_on_close(_stream_slots.release)
+    return response
+
+
+def asgi_stream(asgi_app, app, origins, path="/api/stream"):
+    """Serve ``path`` natively on the event loop and everything else with ``asgi_app``.
+
+    ``origins`` are the CORS origins allowed on /api (``"*"`` or a list),
+    since the stream no longer passes through Flask-CORS.
+    """
+
+    async def application(scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != path or scope["method"] != "GET":
+            return await asgi_app(scope, receive, send)
+
+        args = dict(parse_qsl(scope["query_string"].decode()))
+        headers = {k.decode(): v.decode() for k, v in scope["headers"]}
+        origin = headers.get("origin")
+        extra = []
+        if origins == "*":
+            extra.append((b"access-control-allow-origin", b"*"))
+        elif origin in origins:
+            extra += [(b"access-control-allow-origin", origin.encode()),
+                      (b"access-control-allow-credentials", b"true"), (b"vary", b"Origin")]
+        try:
+            last_id, types = parse_stream_args(args, {"Last-Event-ID": headers.get("last-event-id")})
+        except ValueError as e:
+            await send({"type": "http.response.start", "status": 400,
+                        "headers": [(b"content-type", b"application/json"), *extra]})
+            await send({"type": "http.response.body", "body": dumps({"error": str(e)})})
+            return
+        await asyncio.get_running_loop().run_in_executor(None, broker.start, app)
+        if last_id is None:
+            last_id = broker.last_id
+
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"text/event-stream"),
+            *((k.lower().encode(), v.encode()) for k, v in STREAM_HEADERS.items()),
+            *extra,
+        ]})
+        disconnected = asyncio.ensure_future(receive())  # the next message can only be http.disconnect
+        try:
+            await send({"type": "http.response.body", "body": f"retry: {RETRY_MS}\n\n".encode(), "more_body": True})
+            while True:
+                waiting = asyncio.ensure_future(broker.wait_async(last_id, KEEPALIVE))
+                await asyncio.wait({waiting, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    waiting.cancel()
+                    return
+                events, last_id = broker.after(last_id, types)
+                body = b"".join(format_event(e) for e in events) or b": keepalive\n\n"
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+        finally:
+            disconnected.cancel()
+
+    return application
+
+
+# --- CLI ---
+events_cli = AppGroup("events", help="Manage the server-sent events table (database backend).")
+
+
+@events_cli.command("purge")
+@click.option("--hours", default=24, show_default=True, help="Delete events older than this.")
+def purge_command(hours):
+    """Delete old events."""
+    cutoff = datetime.utcnow() - timedelta(hours=hours)
+    deleted = db.session.execute(delete(Event).where(Event.created_at < cutoff)).rowcount
+    db.session.commit()
+    click.echo(f"Deleted {deleted} events.")
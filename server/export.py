@@ -0,0 +1,105 @@
+"""Streaming NDJSON/CSV export of whole tables.
+
+Rows are read as plain Core tuples with ``yield_per`` (a server-side cursor
+on Postgres) and written out chunk by chunk, so memory stays constant no
+matter how many rows are exported.
+"""
+import csv
+import io
+from datetime import date, datetime
+
+from flask import Response, request, stream_with_context
+from sqlalchemy import select
+
+from config import db
+from serializers import dumps
+import jobs
+
+EXPORT_CHUNK_SIZE = 1000
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _ndjson_chunks(columns, partitions):
+    for rows in partitions:
+        yield b"".join(dumps(row._asdict()) + b"\n" for row in rows)
+
+
+def _csv_chunks(columns, partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in partitions:
+        writer.writerows([_plain(v) for v in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_chunks(statement, columns, fmt):
+    """Yield ``statement``'s rows rendered as ``fmt``, one chunk of EXPORT_CHUNK_SIZE rows at a time."""
+    result = db.session.execute(statement, execution_options={"yield_per": EXPORT_CHUNK_SIZE})
+    try:
+        chunks = _csv_chunks if fmt == "csv" else _ndjson_chunks
+        for chunk in chunks(columns, result.partitions()):
+            yield chunk.encode() if isinstance(chunk, str) else chunk
+    finally:
+        result.close()
+
+
+def attachment_headers(filename, fmt):
+    return {"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+
+
+def stream_export(statement, columns, fmt, filename):
+    """Return a streaming Response for ``statement`` rendered as ``fmt``."""
+    return Response(
+        stream_with_context(export_chunks(statement, columns, fmt)),
+        mimetype=FORMATS[fmt],
+        headers=attachment_headers(filename, fmt),
+    )
+
+
+class StreamingExport:
+    """Mixin for an export resource: GET streams every matching row as NDJSON or CSV.
+
+    Uses the ``model`` and ``apply_filters`` of the list's filters class
+    (e.g. ``AppointmentFilters``), so the export has no other methods; ``export_columns``
+    defaults to every column of the table. With ``Prefer: respond-async`` the
+    export runs as a background job instead (see jobs.py).
+    """
+    export_columns = None
+
+    def export_statement(self):
+        """Return (statement, columns, format) for the current request; raises ValueError."""
+        fmt = request.args.get("format", "ndjson")
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        table = self.model.__table__
+        columns = self.export_columns or [c.name for c in table.columns]
+        statement = self.apply_filters(
+            select(*(table.c[name] for name in columns)).order_by(table.c.id)
+        )
+        return statement, columns, fmt
+
+    def get(self):
+        try:
+            statement, columns, fmt = self.export_statement()
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        if jobs.respond_async():
+            return jobs.accepted(jobs.enqueue("export", {
+                "resource": self.model.__tablename__,
+                "args": request.args.to_dict(),
+            }))
+        return stream_export(statement, columns, fmt, self.model.__tablename__)
@@ -0,0 +1,25 @@
+# Gunicorn settings, overridable with environment variables.
+#   gunicorn -c gunicorn.conf.py 'config:create_app()'
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5555')}"
+
+# WEB_CONCURRENCY is the variable Render and Heroku size for the instance
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread" if threads > 1 else "sync")
+
+# in-memory events reach only the worker that published them (see events.py)
+os.environ.setdefault("EVENTS_BACKEND", "database" if workers > 1 else "memory")
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# recycle workers periodically to cap slow memory growth
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
@@ -0,0 +1,283 @@
+"""Background jobs: bulk imports, exports and reports run outside the web workers.
+
+Jobs are rows in the ``jobs`` table, so no broker is needed: the web process
+inserts a job and answers ``202 Accepted``, and ``flask jobs worker``
+processes poll the table, claim the oldest queued job and run it. Clients
+poll ``GET /api/jobs/<id>`` until the status is ``succeeded`` or ``failed``.
+
+A claim is an ``UPDATE`` guarded by the ``attempts`` value the worker read,
+so when several workers race for the same job exactly one wins (on Postgres
+the candidate row is also read with ``FOR UPDATE SKIP LOCKED``). While a
+job runs, its worker touches ``heartbeat_at`` every ``JOB_HEARTBEAT_INTERVAL``
+seconds; a job whose heartbeat is older than ``JOB_TIMEOUT`` seconds has
+lost its worker and is picked up again, at most ``JOB_MAX_ATTEMPTS`` times
+in all.
+
+A handler's writes (imported rows, export chunks) are committed in the same
+transaction as the job's result, and that commit only goes through if the
+job is still running under the attempt that wrote them. An attempt that
+died, or that was given up on and re-claimed, therefore leaves nothing
+behind, and a retry starts from a clean slate.
+
+Export output is stored in ``job_chunks`` rather than on disk, so the web
+and worker processes need not share a filesystem.
+"""
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import Response, current_app, request, stream_with_context, url_for
+from flask.cli import AppGroup
+from sqlalchemy import and_, delete, insert, or_, select, update
+
+from config import db
+from models import Job, JobChunk
+from serializers import dumps, loads, serialize_job_fields
+import bulk
+import export
+
+KINDS = ("import", "export", "report")
+JOB_TIMEOUT = int(os.getenv("JOB_TIMEOUT", "300"))
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "30"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+
+
+class JobError(Exception):
+    """A job failed in an expected way; ``result`` is kept for the client (e.g. validation errors)."""
+
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+
+# --- Enqueueing ---
+def respond_async():
+    """Whether the client asked for the request to run as a job (``Prefer: respond-async``)."""
+    return "respond-async" in request.headers.get("Prefer", "")
+
+
+def check_params(kind, params):
+    """Raise ValueError unless ``params`` name something a ``kind`` job can run."""
+    import resources
+
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+    if not isinstance(params, dict):
+        raise ValueError("params must be an object")
+    if not isinstance(params.get("args", {}), dict):
+        raise ValueError("params.args must be an object")
+    names = {"import": resources.BULK_MODELS, "export": resources.EXPORTS, "report": resources.REPORTS}[kind]
+    name = params.get("report" if kind == "report" else "resource")
+    if name not in names:
+        field = "report" if kind == "report" else "resource"
+        raise ValueError(f"params.{field} must be one of {', '.join(names)}")
+    if kind == "import" and not isinstance(params.get("rows"), list):
+        raise ValueError("params.rows must be an array")
+
+
+def enqueue(kind, params):
+    """Insert and commit a queued job."""
+    job = Job(kind=kind, params=dumps(params).decode())
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def serialize_job(job):
+    data = serialize_job_fields(job)
+    data["result"] = loads(job.result) if job.result else None
+    if job.status == "succeeded":
+        data["result_url"] = url_for("jobresult", id=job.id)
+    return data
+
+
+def accepted(job):
+    """202 response for a newly queued job."""
+    return serialize_job(job), 202, {"Location": url_for("jobdetail", id=job.id)}
+
+
+# --- Handlers ---
+# Each takes (job, params) and returns a JSON-able result, or raises JobError.
+# They must not commit: run() commits their writes together with the result.
+def run_import(job, params):
+    import resources
+
+    model = resources.BULK_MODELS[params["resource"]]
+    body, status = bulk.bulk_create(model, [(row, None) for row in params["rows"]], commit=False)
+    if status >= 400:
+        raise JobError(body.get("error", "import failed"), body)
+    return body
+
+
+def run_export(job, params):
+    import resources
+
+    with current_app.test_request_context(query_string=params.get("args", {})):
+        statement, columns, fmt = resources.EXPORTS[params["resource"]]().export_statement()
+        size = seq = 0
+        for seq, chunk in enumerate(export.export_chunks(statement, columns, fmt), 1):
+            db.session.execute(insert(JobChunk).values(job_id=job.id, seq=seq, data=chunk))
+            size += len(chunk)
+    return {"format": fmt, "filename": f"{params['resource']}.{fmt}", "bytes": size, "chunks": seq}
+
+
+def run_report(job, params):
+    import resources
+
+    with current_app.test_request_context(query_string=params.get("args", {})):
+        response = resources.REPORTS[params["report"]]().get()
+    body, status = response[0], response[1]
+    if status != 200:
+        raise JobError(body.get("error", "report failed"), body)
+    return body
+
+
+HANDLERS = {"import": run_import, "export": run_export, "report": run_report}
+
+
+# --- Worker ---
+def claim(worker):
+    """Claim the oldest runnable job for ``worker``; returns it or None."""
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=JOB_TIMEOUT)
+    # jobs whose worker died too often are given up
+    db.session.execute(
+        update(Job)
+        .where(Job.status == "running", Job.heartbeat_at < stale, Job.attempts >= JOB_MAX_ATTEMPTS)
+        .values(status="failed", error="worker timed out", finished_at=now)
+    )
+    candidate = db.session.execute(
+        select(Job.id, Job.attempts)
+        .where(or_(Job.status == "queued", and_(Job.status == "running", Job.heartbeat_at < stale)))
+        .where(Job.attempts < JOB_MAX_ATTEMPTS)
+        .order_by(Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).first()
+    claimed = candidate is not None and db.session.execute(
+        update(Job)
+        .where(Job.id == candidate.id, Job.attempts == candidate.attempts)
+        .values(status="running", attempts=Job.attempts + 1, worker=worker, started_at=now, heartbeat_at=now)
+    ).rowcount == 1
+    db.session.commit()
+    return db.session.get(Job, candidate.id) if claimed else None
+
+
+def _finish(job_id, attempt, status, result=None, error=None):
+    """Record the outcome and commit it with the handler's writes, if ``attempt`` still owns the job."""
+    owned = db.session.execute(
+        update(Job).where(Job.id == job_id, Job.attempts == attempt, Job.status == "running").values(
+            status=status,
+            result=dumps(result).decode() if result is not None else None,
+            error=error,
+            finished_at=datetime.utcnow(),
+        )
+    ).rowcount == 1
+    if owned:
+        db.session.commit()
+    else:
+        db.session.rollback()
+        current_app.logger.warning("job %s was taken over after attempt %s; discarding its work", job_id, attempt)
+
+
+def _heartbeat(app, job_id, attempt, stop):
+    while not stop.wait(JOB_HEARTBEAT_INTERVAL):
+        try:
+            with app.app_context(), db.engine.begin() as conn:
+                conn.execute(
+                    update(Job).where(Job.id == job_id, Job.attempts == attempt)
+                    .values(heartbeat_at=datetime.utcnow())
+                )
+        except Exception as e:
+            # e.g. SQLite busy while the job holds the write lock; claims wait on it too
+            app.logger.warning("heartbeat of job %s failed: %s", job_id, e)
+
+
+def run(job):
+    job_id, attempt = job.id, job.attempts
+    stop = threading.Event()
+    threading.Thread(
+        target=_heartbeat, args=(current_app._get_current_object(), job_id, attempt, stop),
+        name=f"job-{job_id}-heartbeat", daemon=True,
+    ).start()
+    try:
+        result = HANDLERS[job.kind](job, loads(job.params))
+    except JobError as e:
+        db.session.rollback()
+        _finish(job_id, attempt, "failed", e.result, str(e))
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("job %s failed", job_id)
+        _finish(job_id, attempt, "failed", error=str(e))
+    else:
+        _finish(job_id, attempt, "succeeded", result)
+    finally:
+        stop.set()
+
+
+def work(worker, interval=JOB_POLL_INTERVAL, once=False):
+    """Run jobs until interrupted; with ``once``, stop when the queue is empty."""
+    while True:
+        job = claim(worker)
+        if job is None:
+            if once:
+                return
+            time.sleep(interval)
+            continue
+        run(job)
+        db.session.remove()
+
+
+def result_response(job):
+    """Serve a finished job's output: the stored file for exports, else the JSON result."""
+    result = loads(job.result) if job.result else None
+    if job.kind != "export":
+        return result, 200
+
+    def generate():
+        rows = db.session.execute(
+            select(JobChunk.data).where(JobChunk.job_id == job.id).order_by(JobChunk.seq),
+            execution_options={"yield_per": 1},
+        )
+        try:
+            for (data,) in rows:
+                yield data
+        finally:
+            rows.close()
+
+    filename, fmt = result["filename"].rsplit(".", 1)
+    return Response(
+        stream_with_context(generate()),
+        mimetype=export.FORMATS[result["format"]],
+        headers={**export.attachment_headers(filename, fmt), "Content-Length": str(result["bytes"])},
+    )
+
+
+# --- CLI ---
+jobs_cli = AppGroup("jobs", help="Run and manage background jobs.")
+
+
+@jobs_cli.command("worker")
+@click.option("--once", is_flag=True, help="Exit when the queue is empty.")
+@click.option("--interval", default=JOB_POLL_INTERVAL, show_default=True, help="Seconds between polls when idle.")
+def worker_command(once, interval):
+    """Process queued jobs."""
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    click.echo(f"Job worker {worker} started.")
+    work(worker, interval=interval, once=once)
+
+
+@jobs_cli.command("purge")
+@click.option("--days", default=7, show_default=True, help="Delete finished jobs older than this.")
+def purge_command(days):
+    """Delete finished jobs and their output."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    old = select(Job.id).where(Job.status.in_(("succeeded", "failed")), Job.finished_at < cutoff)
+    db.session.execute(delete(JobChunk).where(JobChunk.job_id.in_(old)))
+    deleted = db.session.execute(delete(Job).where(Job.id.in_(old))).rowcount
+    db.session.commit()
+    click.echo(f"Deleted {deleted} jobs.")
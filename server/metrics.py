@@ -0,0 +1,209 @@
+"""Opt-in request instrumentation: SQL statements, database time and encode time.
+
+Enabled with ``INSTRUMENTATION=true``. Every response then carries a
+``Server-Timing`` header, visible in the browser's network panel::
+
+    Server-Timing: db;dur=41.2;desc="4 queries", encode;dur=6.3, total;dur=55.0
+
+and ``GET /metrics`` serves per-route totals in the Prometheus text format:
+requests by status, a latency histogram, SQL statements, database time,
+JSON encode time and the number of items in list responses. Counters are
+kept per process, so with several gunicorn workers each scrape sees one
+worker; sum over the ``instance`` label.
+
+Statements taking longer than ``SLOW_QUERY_MS`` (default 200) are logged at
+WARNING with the route that ran them, in web and job worker processes alike.
+
+Database time is measured around the driver's ``execute``, so rows fetched
+later (streamed exports) are not included, and ``encode`` covers only the
+JSON encoding of Flask-RESTful responses.
+"""
+import os
+import threading
+import time
+
+from flask import Response, current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# request duration histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# --- Per-process totals ---
+class RouteStats:
+    def __init__(self):
+        self.statuses = {}
+        self.buckets = [0] * len(BUCKETS)
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.encode_time = 0.0
+        self.rows = 0
+        self.slow_queries = 0
+
+
+def _sample(value):
+    """A sample value in full: counters exactly, floats as their shortest round-trip repr."""
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+class Registry:
+    def __init__(self):
+        self.routes = {}  # (route, method) -> RouteStats
+        self._lock = threading.Lock()
+
+    def record(self, route, method, status, duration, state):
+        with self._lock:
+            stats = self.routes.get((route, method))
+            if stats is None:
+                stats = self.routes[(route, method)] = RouteStats()
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            for i, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    stats.buckets[i] += 1
+            stats.duration += duration
+            stats.queries += state["queries"]
+            stats.db_time += state["db"]
+            stats.encode_time += state["encode"]
+            stats.rows += state["rows"]
+            stats.slow_queries += state["slow"]
+
+    def render(self):
+        """The totals in the Prometheus text exposition format."""
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        with self._lock:
+            routes = sorted(self.routes.items())
+            labels = {key: f'route="{key[0]}",method="{key[1]}"' for key, _ in routes}
+            family("duncare_requests_total", "counter", "HTTP requests by route and status.", [
+                f'duncare_requests_total{{{labels[key]},status="{status}"}} {count}'
+                for key, stats in routes for status, count in sorted(stats.statuses.items())
+            ])
+            histogram = []
+            for key, stats in routes:
+                total = sum(stats.statuses.values())
+                histogram += [
+                    f'duncare_request_duration_seconds_bucket{{{labels[key]},le="{bound}"}} {count}'
+                    for bound, count in zip(BUCKETS, stats.buckets)
+                ]
+                histogram += [
+                    f'duncare_request_duration_seconds_bucket{{{labels[key]},le="+Inf"}} {total}',
+                    f"duncare_request_duration_seconds_sum{{{labels[key]}}} {_sample(stats.duration)}",
+                    f"duncare_request_duration_seconds_count{{{labels[key]}}} {total}",
+                ]
+            family("duncare_request_duration_seconds", "histogram", "Request handling time.", histogram)
+            for name, attr, kind, help_text in (
+                ("duncare_db_queries_total", "queries", "counter", "SQL statements executed."),
+                ("duncare_db_duration_seconds_total", "db_time", "counter", "Time spent executing SQL."),
+                ("duncare_encode_duration_seconds_total", "encode_time", "counter", "Time spent encoding JSON."),
+                ("duncare_response_rows_total", "rows", "counter", "Items returned in list responses."),
+                ("duncare_slow_queries_total", "slow_queries", "counter",
+                 f"SQL statements slower than {SLOW_QUERY_MS:g} ms."),
+            ):
+                family(name, kind, help_text, [
+                    f"{name}{{{labels[key]}}} {_sample(getattr(stats, attr))}" for key, stats in routes
+                ])
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def _state():
+    """The current request's counters, or None outside an instrumented request."""
+    return g.get("instrumentation") if has_request_context() else None
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+# --- SQL statements ---
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    slow = elapsed * 1000 >= SLOW_QUERY_MS
+    state = _state()
+    if state is not None:
+        state["queries"] += 1
+        state["db"] += elapsed
+        state["slow"] += slow
+    if slow and has_app_context():
+        current_app.logger.warning(
+            "slow query (%.0f ms) in %s: %s", elapsed * 1000,
+            _route() if has_request_context() else "background", statement,
+        )
+
+
+def handle_error(context):
+    # a failed statement never reaches after_cursor_execute
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+_listening = False
+
+def listen():
+    """Attach the statement hooks to every engine, once per process."""
+    global _listening
+    if not _listening:
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(Engine, "handle_error", handle_error)
+        _listening = True
+
+
+# --- Requests ---
+def start_request():
+    g.instrumentation = {"started": time.perf_counter(), "queries": 0, "db": 0.0, "encode": 0.0, "rows": 0, "slow": 0}
+
+
+def finish_request(response):
+    state = _state()
+    if state is None or request.endpoint == "metrics":
+        return response
+    duration = time.perf_counter() - state["started"]
+    response.headers["Server-Timing"] = (
+        f'db;dur={state["db"] * 1000:.1f};desc="{state["queries"]} queries", '
+        f'encode;dur={state["encode"] * 1000:.1f}, total;dur={duration * 1000:.1f}'
+    )
+    registry.record(_route(), request.method, response.status_code, duration, state)
+    return response
+
+
+def timed_representation(output):
+    """Wrap a Flask-RESTful representation to time encoding and count list items."""
+    def timed_output(data, code, headers=None):
+        state = _state()
+        if state is None:
+            return output(data, code, headers)
+        started = time.perf_counter()
+        response = output(data, code, headers)
+        state["encode"] += time.perf_counter() - started
+        if isinstance(data, list):
+            state["rows"] += len(data)
+        return response
+    return timed_output
+
+
+def metrics_view():
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app, api):
+    listen()
+    api.representations["application/json"] = timed_representation(api.representations["application/json"])
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
@@ -0,0 +1,77 @@
+"""Add full-text search index
+
+Revision ID: 3c7e52a1d9f4
+Revises: 48bbbb98f571
+Create Date: 2026-10-18 09:02:41.518334
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c7e52a1d9f4'
+down_revision = '48bbbb98f571'
+branch_labels = None
+depends_on = None
+
+
+# Index the existing rows, with the documents search.py builds: owners by
+# name, email and phone; pets by name, species, breed, color, medical notes
+# and treatment notes; treatments by description. The SQLite rowid encodes
+# (kind, ref_id) as ref_id * 3 + kind code; ' ' || NULL is NULL, so missing
+# parts are skipped like search._join does.
+SQLITE_BACKFILL = [
+    "INSERT INTO search_index (rowid, kind, ref_id, title, body) "
+    "SELECT id * 3, 'owner', id, name, ltrim(coalesce(' ' || email, '') || coalesce(' ' || phone, '')) FROM owners",
+    "INSERT INTO search_index (rowid, kind, ref_id, title, body) "
+    "SELECT id * 3 + 1, 'pet', id, name, ltrim("
+    "coalesce(' ' || species, '') || coalesce(' ' || breed, '') || coalesce(' ' || color, '') || "
+    "coalesce(' ' || medical_notes, '') || coalesce(' ' || "
+    "(SELECT group_concat(notes, ' ') FROM pet_treatments WHERE pet_treatments.pet_id = pets.id), '')) "
+    "FROM pets",
+    "INSERT INTO search_index (rowid, kind, ref_id, title, body) "
+    "SELECT id * 3 + 2, 'treatment', id, description, '' FROM treatments",
+]
+POSTGRES_BACKFILL = [
+    "INSERT INTO search_documents (kind, ref_id, title, body) "
+    "SELECT 'owner', id, name, concat_ws(' ', email, phone) FROM owners",
+    "INSERT INTO search_documents (kind, ref_id, title, body) "
+    "SELECT 'pet', id, name, concat_ws(' ', species, breed, color, medical_notes, "
+    "(SELECT string_agg(notes, ' ') FROM pet_treatments WHERE pet_treatments.pet_id = pets.id)) "
+    "FROM pets",
+    "INSERT INTO search_documents (kind, ref_id, title, body) "
+    "SELECT 'treatment', id, description, '' FROM treatments",
+]
+
+
+def upgrade():
+    # Not autogenerated: an FTS5 virtual table on SQLite, a tsvector table on
+    # Postgres, filled from the existing rows.
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE search_index USING fts5("
+            "kind UNINDEXED, ref_id UNINDEXED, title, body, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+    elif dialect == 'postgresql':
+        op.execute(
+            "CREATE TABLE search_documents ("
+            "kind VARCHAR(16) NOT NULL, ref_id INTEGER NOT NULL, title TEXT, body TEXT, "
+            "document TSVECTOR GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(body, '')), 'B')) STORED, "
+            "PRIMARY KEY (kind, ref_id))"
+        )
+        op.execute("CREATE INDEX ix_search_documents_document ON search_documents USING gin (document)")
+    for statement in {'sqlite': SQLITE_BACKFILL, 'postgresql': POSTGRES_BACKFILL}.get(dialect, []):
+        op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE search_index")
+    elif dialect == 'postgresql':
+        op.execute("DROP TABLE search_documents")
@@ -0,0 +1,29 @@
+"""Add job heartbeats
+
+Revision ID: b7e4d1a2c9f3
+Revises: ccd94bef05a0
+Create Date: 2026-10-18 09:40:27.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e4d1a2c9f3'
+down_revision = 'ccd94bef05a0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+    # running jobs were last known alive when they started
+    op.execute("UPDATE jobs SET heartbeat_at = started_at WHERE status = 'running'")
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
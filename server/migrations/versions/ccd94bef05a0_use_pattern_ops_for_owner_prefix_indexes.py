@@ -0,0 +1,36 @@
+"""Use pattern ops for the owner prefix indexes
+
+Revision ID: ccd94bef05a0
+Revises: 6d749e0f05a3
+Create Date: 2026-10-18 09:20:13.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ccd94bef05a0'
+down_revision = '6d749e0f05a3'
+branch_labels = None
+depends_on = None
+
+
+def _recreate(ops):
+    op.drop_index('ix_owners_lower_name', table_name='owners')
+    op.drop_index('ix_owners_lower_email', table_name='owners')
+    op.create_index('ix_owners_lower_name', 'owners', [sa.text(f'lower(name) {ops}')], unique=False)
+    op.create_index('ix_owners_lower_email', 'owners', [sa.text(f'lower(email) {ops}')], unique=False)
+
+
+def upgrade():
+    # The owner name/email filters are LIKE 'prefix%' on lower(column). Under a
+    # linguistic collation Postgres can only use an index for that with
+    # text_pattern_ops; SQLite's plain expression indexes stay as they are.
+    if op.get_bind().dialect.name == 'postgresql':
+        _recreate('text_pattern_ops')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        _recreate('')
@@ -1,8 +1,8 @@
 
 from config import db
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Float, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Float, Boolean, Index, func
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from datetime import datetime, timedelta
 
 
 class Staff(db.Model):
@@ -13,6 +13,7 @@ class Staff(db.Model):
     role = db.Column(String, nullable = False)
     email = db.Column(String, nullable = False)
     phone = db.Column(String, nullable = False)
+    updated_at = db.Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     appointments = relationship("Appointment", back_populates="staff", cascade="all, delete")
     treatments = relationship("Treatment", back_populates="staff", cascade="all, delete")
@@ -25,22 +26,29 @@ class Owner(db.Model):
     name = Column(String, nullable=False)
     email = Column(String, nullable= False)
     phone = Column(String, nullable= False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     pets = relationship("Pet", back_populates="owner", cascade="all, delete-orphan")
 
+# OwnerList searches by case-insensitive name/email prefix, lower(column) LIKE
+# 'prefix%'; on Postgres the migration builds these with text_pattern_ops
+Index("ix_owners_lower_name", func.lower(Owner.name))
+Index("ix_owners_lower_email", func.lower(Owner.email))
+
 class Pet(db.Model):
     __tablename__ = "pets"
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable = False)
-    species = db.Column(db.String)
-    breed = db.Column(db.String)
-    sex = db.Column(db.String)
+    species = db.Column(db.String, index=True)
+    breed = db.Column(db.String, index=True)
+    sex = db.Column(db.String, index=True)
     color = db.Column(db.String)
     dob = db.Column(db.DateTime)
     medical_notes = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    owner_id = db.Column(db.Integer, db.ForeignKey("owners.id"))
+    owner_id = db.Column(db.Integer, db.ForeignKey("owners.id"), index=True)
     owner = db.relationship("Owner", back_populates="pets")
 
     appointments = db.relationship("Appointment", back_populates="pet", cascade="all, delete")
@@ -50,12 +58,31 @@ class Pet(db.Model):
 
     billings = db.relationship("Billing", back_populates="pet", cascade="all, delete")
 
+APPOINTMENT_DEFAULT_DURATION = timedelta(minutes=30)
+# Longest bookable appointment; bounds the index range scanned by the
+# overlap check (see scheduling.py)
+APPOINTMENT_MAX_DURATION = timedelta(hours=8)
+
+def _default_end_date(context):
+    start = context.get_current_parameters().get("date")
+    return start + APPOINTMENT_DEFAULT_DURATION if start is not None else None
+
 class Appointment(db.Model):
     __tablename__ = "appointments"
+    __table_args__ = (
+        # also serves pet_id lookups
+        db.Index("ix_appointments_pet_id_date", "pet_id", "date"),
+        # overlap checks and availability; also serves staff_id lookups
+        db.Index("ix_appointments_staff_id_date_end_date", "staff_id", "date", "end_date"),
+        # calendar and from/to range queries; also serves date lookups
+        db.Index("ix_appointments_date_staff_id", "date", "staff_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.DateTime)
+    end_date = db.Column(db.DateTime, default=_default_end_date)
     reason = db.Column(db.String)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     pet_id = db.Column(db.Integer, db.ForeignKey("pets.id"))
     pet = db.relationship("Pet", back_populates="appointments")
@@ -67,10 +94,11 @@ class Treatment(db.Model):
     __tablename__ = "treatments"
 
     id = db.Column(db.Integer, primary_key=True)
-    date = db.Column(db.DateTime)
+    date = db.Column(db.DateTime, index=True)
     description = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    staff_id = db.Column(db.Integer, db.ForeignKey("staff.id"))
+    staff_id = db.Column(db.Integer, db.ForeignKey("staff.id"), index=True)
     staff = db.relationship("Staff", back_populates="treatments")
 
     medications = db.relationship("Medication", back_populates="treatment", cascade="all, delete")
@@ -83,10 +111,12 @@ class PetTreatment(db.Model):
     __tablename__ = "pet_treatments"
     
     pet_id = db.Column(db.Integer, db.ForeignKey("pets.id"), primary_key=True)
-    treatment_id = db.Column(db.Integer, db.ForeignKey("treatments.id"), primary_key=True)
+    # pet_id lookups use the primary key; treatment_id needs its own index
+    treatment_id = db.Column(db.Integer, db.ForeignKey("treatments.id"), primary_key=True, index=True)
     
     treatment_date = db.Column(db.DateTime, default=datetime.utcnow)
     notes = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     pet = db.relationship("Pet", back_populates="pet_treatments")
     treatment = db.relationship("Treatment", back_populates="pet_treatments")
@@ -98,19 +128,115 @@ class Medication(db.Model):
     name = db.Column(db.String)
     dosage = db.Column(db.String)
     frequency = db.Column(db.String)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    treatment_id = db.Column(db.Integer, db.ForeignKey("treatments.id"))
+    treatment_id = db.Column(db.Integer, db.ForeignKey("treatments.id"), index=True)
     treatment = db.relationship("Treatment", back_populates="medications")
 
 
 class Billing(db.Model):
     __tablename__ = "billings"
+    __table_args__ = (
+        # also serves pet_id lookups
+        db.Index("ix_billings_pet_id_date", "pet_id", "date"),
+        db.Index("ix_billings_paid_date", "paid", "date"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    date = db.Column(db.DateTime)
+    date = db.Column(db.DateTime, index=True)
     amount = db.Column(db.Float)
     description = db.Column(db.String)
     paid = db.Column(db.Boolean, default=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     pet_id = db.Column(db.Integer, db.ForeignKey("pets.id"))
     pet = db.relationship("Pet", back_populates="billings")
+
+
+class TableVersion(db.Model):
+    """Change counter per table, bumped in the writing transaction (see versions.py)."""
+    __tablename__ = "table_versions"
+
+    table_name = db.Column(db.String, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class Change(db.Model):
+    """One insert, update or delete of a clinic row, in commit order (see changes.py)."""
+    __tablename__ = "changes"
+    # AUTOINCREMENT, so SQLite never hands out the seq of a purged change again
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    table_name = db.Column(db.String, nullable=False)
+    # primary key value, or values joined with "," for pet_treatments
+    row_id = db.Column(db.String, nullable=False)
+    op = db.Column(db.String, nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class Event(db.Model):
+    """A server-sent event, for the database events backend (see events.py)."""
+    __tablename__ = "events"
+    # AUTOINCREMENT, so SQLite never reuses the id of a purged event
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    type = db.Column(db.String, nullable=False)
+    data = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class PetBalance(db.Model):
+    """Running paid/unpaid billing totals for a pet (see balances.py)."""
+    __tablename__ = "pet_balances"
+
+    pet_id = db.Column(db.Integer, db.ForeignKey("pets.id", ondelete="CASCADE"), primary_key=True)
+    paid_total = db.Column(db.Float, nullable=False, default=0)
+    unpaid_total = db.Column(db.Float, nullable=False, default=0)
+    paid_count = db.Column(db.Integer, nullable=False, default=0)
+    unpaid_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class OwnerBalance(db.Model):
+    """Running paid/unpaid billing totals over all of an owner's pets (see balances.py)."""
+    __tablename__ = "owner_balances"
+
+    owner_id = db.Column(db.Integer, db.ForeignKey("owners.id", ondelete="CASCADE"), primary_key=True)
+    paid_total = db.Column(db.Float, nullable=False, default=0)
+    # the unpaid-balances report reads owners largest balance first
+    unpaid_total = db.Column(db.Float, nullable=False, default=0, index=True)
+    paid_count = db.Column(db.Integer, nullable=False, default=0)
+    unpaid_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class Job(db.Model):
+    """Background job run by ``flask jobs worker`` (see jobs.py)."""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # workers claim the oldest queued job
+        db.Index("ix_jobs_status_id", "status", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String, nullable=False)
+    status = db.Column(db.String, nullable=False, default="queued")
+    params = db.Column(db.Text, nullable=False)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    worker = db.Column(db.String)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    # touched while a worker runs the job; a stale one means the worker died
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+
+class JobChunk(db.Model):
+    """A piece of a job's file output, stored in order so any web worker can serve it."""
+    __tablename__ = "job_chunks"
+
+    job_id = db.Column(db.Integer, db.ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True)
+    seq = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)
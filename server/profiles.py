@@ -0,0 +1,100 @@
+"""Pet profile: everything the pet chart shows, in one response.
+
+``pet_profile`` reads the pet with its owner and billing balance, the most
+recent appointments, treatments and bills, and the medications of those
+treatments. That is five queries however long the pet's history is: each
+section is one range scan of a ``pet_id`` index (``ix_appointments_pet_id_date``,
+the ``pet_treatments`` primary key, ``ix_billings_pet_id_date``), cut to
+its limit in SQL, and the medications are one ``IN`` query over the
+treatments returned. A section's ``total`` is computed by the same query
+with ``COUNT(*) OVER ()``, so the client knows whether there is more to page
+through in the list endpoints.
+"""
+from sqlalchemy import func, select
+
+from models import Owner, Pet, Appointment, Treatment, PetTreatment, Medication, Billing, PetBalance
+from serializers import OWNER_FIELDS, PET_FIELDS, APPOINTMENT_FIELDS, MEDICATION_FIELDS, BILLING_FIELDS
+import balances
+
+PET_PROFILE_FIELDS = PET_FIELDS + ("color", "dob", "medical_notes")
+# Default number of rows per section, by the query parameter that overrides it
+DEFAULT_LIMITS = {"appointments": 10, "treatments": 20, "billings": 10}
+MAX_LIMIT = 100
+# Every table the profile reads from; pet_balances changes only with billings
+TABLES = ("pets", "owners", "appointments", "pet_treatments", "treatments", "medications", "billings")
+
+
+def _columns(model, fields, prefix=""):
+    return [getattr(model, f).label(prefix + f) for f in fields]
+
+
+def _recent(conn, query, limit):
+    """{"items": [...], "total": n} for the first ``limit`` rows of ``query``."""
+    if limit == 0:
+        total = conn.execute(select(func.count()).select_from(query.subquery())).scalar()
+        return {"items": [], "total": total}
+    rows = conn.execute(query.add_columns(func.count().over().label("total")).limit(limit)).all()
+    items = [row._asdict() for row in rows]
+    for item in items:
+        del item["total"]
+    return {"items": items, "total": rows[0].total if rows else 0}
+
+
+def pet_profile(conn, pet_id, limits=DEFAULT_LIMITS):
+    """The profile of ``pet_id``, or None if there is no such pet."""
+    head = conn.execute(
+        select(
+            *_columns(Pet, PET_PROFILE_FIELDS),
+            *_columns(Owner, OWNER_FIELDS, "owner."),
+            *_columns(PetBalance, balances.FIELDS),
+        )
+        .outerjoin(Owner, Owner.id == Pet.owner_id)
+        .outerjoin(PetBalance, PetBalance.pet_id == Pet.id)
+        .where(Pet.id == pet_id)
+    ).first()
+    if head is None:
+        return None
+    head = head._mapping
+    owner = {f: head["owner." + f] for f in OWNER_FIELDS} if head["owner.id"] is not None else None
+
+    appointments = _recent(conn, (
+        select(*_columns(Appointment, APPOINTMENT_FIELDS))
+        .where(Appointment.pet_id == pet_id)
+        .order_by(Appointment.date.desc().nulls_last(), Appointment.id.desc())
+    ), limits["appointments"])
+
+    treatments = _recent(conn, (
+        select(
+            PetTreatment.treatment_id, Treatment.date, Treatment.description, Treatment.staff_id,
+            PetTreatment.treatment_date, PetTreatment.notes,
+        )
+        .join(Treatment, Treatment.id == PetTreatment.treatment_id)
+        .where(PetTreatment.pet_id == pet_id)
+        .order_by(PetTreatment.treatment_date.desc().nulls_last(), PetTreatment.treatment_id.desc())
+    ), limits["treatments"])
+    by_treatment = {t["treatment_id"]: t for t in treatments["items"]}
+    for t in by_treatment.values():
+        t["medications"] = []
+    if by_treatment:
+        for row in conn.execute(
+            select(*_columns(Medication, MEDICATION_FIELDS))
+            .where(Medication.treatment_id.in_(list(by_treatment)))
+            .order_by(Medication.id)
+        ):
+            by_treatment[row.treatment_id]["medications"].append(row._asdict())
+
+    billings = _recent(conn, (
+        select(*_columns(Billing, BILLING_FIELDS))
+        .where(Billing.pet_id == pet_id)
+        .order_by(Billing.date.desc().nulls_last(), Billing.id.desc())
+    ), limits["billings"])
+    # no balance row yet means no bills
+    summary = {f: head[f] if head[f] is not None else zero for f, zero in zip(balances.FIELDS, balances.ZERO)}
+
+    return {
+        "pet": {f: head[f] for f in PET_PROFILE_FIELDS},
+        "owner": owner,
+        "appointments": appointments,
+        "treatments": treatments,
+        "billing": {**summary, "recent": billings},
+    }
@@ -0,0 +1,119 @@
+"""Aggregate reports computed in SQL.
+
+Each report is one GROUP BY query that returns only the aggregates, and each
+one filters on a column with an index: billings.date (``ix_billings_date``,
+``ix_billings_paid_date``), appointments.date and treatments.date. ``start``
+is inclusive and ``end`` exclusive, as with the ``from``/``to`` list filters.
+"""
+from sqlalchemy import case, func, select
+
+from models import Owner, Pet, Appointment, Treatment, PetTreatment, Billing, Staff, OwnerBalance
+
+PERIODS = ("day", "month", "year")
+
+
+def period_bucket(column, period, dialect):
+    """``column`` truncated to ``period`` as an ISO string (2024-03, 2024-03-05)."""
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+    if dialect == "postgresql":
+        fmt = {"day": "YYYY-MM-DD", "month": "YYYY-MM", "year": "YYYY"}[period]
+        return func.to_char(column, fmt)
+    fmt = {"day": "%Y-%m-%d", "month": "%Y-%m", "year": "%Y"}[period]
+    return func.strftime(fmt, column)
+
+
+def _between(query, column, start, end):
+    if start is not None:
+        query = query.where(column >= start)
+    if end is not None:
+        query = query.where(column < end)
+    return query
+
+
+def _money(value):
+    return round(float(value or 0), 2)
+
+
+def revenue(conn, start=None, end=None, period="month"):
+    """Billed, paid and unpaid totals per period."""
+    bucket = period_bucket(Billing.date, period, conn.dialect.name).label("period")
+    paid_amount = func.sum(case((Billing.paid.is_(True), Billing.amount), else_=0))
+    query = _between(
+        select(bucket, func.count().label("count"), func.sum(Billing.amount), paid_amount)
+        .where(Billing.date.is_not(None)),
+        Billing.date, start, end,
+    ).group_by(bucket).order_by(bucket)
+    return [
+        {"period": p, "count": count, "billed": _money(billed), "paid": _money(paid),
+         "unpaid": _money((billed or 0) - (paid or 0))}
+        for p, count, billed, paid in conn.execute(query)
+    ]
+
+
+def unpaid_balances(conn, start=None, end=None, limit=None):
+    """Unpaid total per owner, largest first.
+
+    Without a date range this reads the running totals in owner_balances
+    (see balances.py) instead of aggregating billings.
+    """
+    if start is None and end is None:
+        query = (
+            select(Owner.id, Owner.name, OwnerBalance.unpaid_count, OwnerBalance.unpaid_total)
+            .select_from(OwnerBalance)
+            .join(Owner, Owner.id == OwnerBalance.owner_id)
+            .where(OwnerBalance.unpaid_count > 0)
+            .order_by(OwnerBalance.unpaid_total.desc(), Owner.id)
+        )
+    else:
+        query = _unpaid_by_owner(start, end)
+    if limit is not None:
+        query = query.limit(limit)
+    return [
+        {"owner_id": owner_id, "name": name, "unpaid_count": count, "unpaid": _money(total)}
+        for owner_id, name, count, total in conn.execute(query)
+    ]
+
+
+def _unpaid_by_owner(start, end):
+    balance = func.sum(Billing.amount)
+    return _between(
+        select(Owner.id, Owner.name, func.count(Billing.id), balance)
+        .select_from(Billing)
+        .join(Pet, Pet.id == Billing.pet_id)
+        .join(Owner, Owner.id == Pet.owner_id)
+        .where(Billing.paid.is_(False)),
+        Billing.date, start, end,
+    ).group_by(Owner.id, Owner.name).order_by(balance.desc(), Owner.id)
+
+
+def appointments_by_staff(conn, start=None, end=None):
+    """Appointment count per staff member; staff with none in range are omitted."""
+    count = func.count(Appointment.id)
+    query = _between(
+        select(Staff.id, Staff.name, Staff.role, count)
+        .select_from(Appointment)
+        .join(Staff, Staff.id == Appointment.staff_id),
+        Appointment.date, start, end,
+    ).group_by(Staff.id, Staff.name, Staff.role).order_by(count.desc(), Staff.id)
+    return [
+        {"staff_id": staff_id, "name": name, "role": role, "appointments": n}
+        for staff_id, name, role, n in conn.execute(query)
+    ]
+
+
+def treatments_by_species(conn, start=None, end=None):
+    """Treatments given and distinct pets treated per species."""
+    treatments = func.count(PetTreatment.treatment_id)
+    query = _between(
+        select(Pet.species, treatments, func.count(func.distinct(Pet.id)))
+        .select_from(PetTreatment)
+        .join(Treatment, Treatment.id == PetTreatment.treatment_id)
+        .join(Pet, Pet.id == PetTreatment.pet_id),
+        Treatment.date, start, end,
+    ).group_by(Pet.species).order_by(treatments.desc(), Pet.species)
+    return [
+        {"species": species, "treatments": n, "pets": pets}
+        for species, n, pets in conn.execute(query)
+    ]
+
@@ -0,0 +1,865 @@
+from datetime import datetime, timedelta
+from flask import current_app, request, jsonify, render_template, url_for
+from flask_restful import Resource
+from config import db
+from models import (
+    Staff, Owner, Pet, Appointment, Treatment, PetTreatment, Medication, Billing, PetBalance, OwnerBalance, Job,
+)
+import balances
+import bulk
+import cache
+import changes
+import events
+import export
+import jobs
+import profiles
+import reports
+import scheduling
+import search
+import versions
+from serializers import (
+    serialize_staff, serialize_owner, serialize_pet, serialize_appointment, serialize_treatment,
+    serialize_medication, serialize_billing, serialize_row, sparse_serializer, STAFF_FIELDS, OWNER_FIELDS,
+    PET_FIELDS, APPOINTMENT_FIELDS, TREATMENT_FIELDS, MEDICATION_FIELDS, BILLING_FIELDS, PET_EMBEDS,
+    TREATMENT_EMBEDS,
+)
+from sqlalchemy import func, literal, select
+from sqlalchemy.orm import load_only, selectinload
+
+# --- Loader strategies ---
+# Eager loads for each embed the serializers can include, by embed name.
+# The treatments embed walks pet_treatments -> treatment
+PET_EMBED_LOADERS = {
+    "treatments": (selectinload(Pet.pet_treatments).joinedload(PetTreatment.treatment),),
+}
+PET_TABLES = ("pets", "pet_treatments", "treatments")
+TREATMENT_EMBED_LOADERS = {
+    "medications": (selectinload(Treatment.medications),),
+    "pets": (selectinload(Treatment.pets),),
+}
+TREATMENT_TABLES = ("treatments", "medications", "pet_treatments", "pets")
+
+# --- Query parameter filters ---
+# Each helper raises ValueError on bad input; list resources turn that into a 400.
+def parse_int_arg(name):
+    value = request.args.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+
+def parse_datetime_arg(name):
+    value = request.args.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 date")
+
+def parse_bool_arg(name):
+    value = request.args.get(name)
+    if value in (None, ""):
+        return None
+    if value.lower() in ("true", "1", "yes"):
+        return True
+    if value.lower() in ("false", "0", "no"):
+        return False
+    raise ValueError(f"{name} must be true or false")
+
+def _escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def prefix_filter(column, prefix):
+    """Case-insensitive prefix match: lower(column) LIKE lower(:prefix) || '%'.
+
+    Both sides are folded by the database's lower(), so SQLite (ASCII-only
+    folding) and Postgres agree with themselves. On Postgres the
+    text_pattern_ops lower() indexes serve it whatever the collation.
+    """
+    return func.lower(column).like(func.lower(literal(_escape_like(prefix))) + "%", escape="\\")
+
+def substring_filter(column, text):
+    return column.ilike(f"%{_escape_like(text)}%", escape="\\")
+
+def date_range_filters(query, column):
+    start = parse_datetime_arg("from")
+    end = parse_datetime_arg("to")
+    if start is not None:
+        query = query.filter(column >= start)
+    if end is not None:
+        query = query.filter(column < end)
+    return query
+
+# --- Sparse fieldsets ---
+def _names(param):
+    return [name.strip() for name in request.args[param].split(",") if name.strip()]
+
+def parse_fieldset(fields, embeds=()):
+    """Read ?fields= and ?include=; returns (fields, embeds) in declaration order or raises ValueError.
+
+    Without either parameter everything is returned. ``?fields=`` picks
+    columns and may also name embeds; ``?include=`` names embeds and keeps
+    every column unless ``?fields=`` narrows them too. ``id`` is always sent.
+    """
+    if "fields" not in request.args and "include" not in request.args:
+        return tuple(fields), tuple(embeds)
+    picked = set(_names("fields")) if "fields" in request.args else set(fields)
+    included = set(_names("include")) if "include" in request.args else set()
+    for name in picked - set(fields) - set(embeds):
+        raise ValueError(f"fields: unknown field {name!r}; choose from {', '.join((*fields, *embeds))}")
+    for name in included - set(embeds):
+        choices = f"choose from {', '.join(embeds)}" if embeds else "this resource has none"
+        raise ValueError(f"include: unknown embed {name!r}; {choices}")
+    picked.add("id")
+    return (
+        tuple(f for f in fields if f in picked),
+        tuple(e for e in embeds if e in picked or e in included),
+    )
+
+# --- Pagination ---
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def parse_page_args():
+    """Read ?limit=&after= from the request; returns (limit, after) or raises ValueError."""
+    limit = request.args.get("limit")
+    after = request.args.get("after")
+    if limit is None and after is None:
+        return None, None
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_PAGE_SIZE
+        after = int(after) if after is not None else None
+    except ValueError:
+        raise ValueError("limit and after must be integers")
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit, after
+
+class ListFilters:
+    """The query-string filters of a list endpoint, shared with its export."""
+    model = None
+
+    def apply_filters(self, query):
+        """Narrow ``query`` from request args. Works on ORM queries and Core selects."""
+        return query
+
+class PaginatedListResource(ListFilters, Resource):
+    """Base for list endpoints: keyset pagination on the primary key.
+
+    Without ?limit/?after the full list is returned, so existing clients keep
+    working. With them, rows are fetched with ``WHERE id > :after ORDER BY id
+    LIMIT :limit + 1`` and the cursor for the next page is sent back in the
+    ``X-Next-Cursor`` and ``Link`` headers.
+
+    Responses carry a weak ETag built from the versions of ``etag_tables``
+    (default: the model's table); a matching If-None-Match gets a 304.
+
+    ``?fields=`` and ``?include=`` (see ``parse_fieldset``) narrow the
+    response. Only the chosen columns are SELECTed, and rows are read as
+    Core rows unless an embed is included.
+    """
+    model = None
+    # Flat resources set row_fields: list pages are then read as Core rows
+    # and serialized without building ORM objects.
+    row_fields = None
+    # Resources with nested collections set fields (their columns), embeds
+    # (serializers.*_EMBEDS) and, per embed, the eager loads its serializer
+    # needs, so a page costs a fixed number of SELECTs instead of one per row.
+    fields = None
+    embeds = {}
+    embed_loaders = {}
+    # Every table the serialized response reads from
+    etag_tables = None
+    # Serve GETs from the response cache (reference data that rarely changes)
+    cached = False
+
+    def get_query(self, fields, embeds):
+        if not embeds:
+            table = self.model.__table__
+            return self.apply_filters(select(*(table.c[f] for f in fields)))
+        options = [load_only(*(getattr(self.model, f) for f in fields))]
+        for name in embeds:
+            options.extend(self.embed_loaders[name])
+        return self.apply_filters(self.model.query.options(*options))
+
+    def fetch(self, query, fields, embeds):
+        if not embeds:
+            return [serialize_row(row) for row in db.session.execute(query)]
+        serializer = sparse_serializer(fields, {name: self.embeds[name] for name in embeds})
+        return [serializer(obj) for obj in query.all()]
+
+    def get(self):
+        if self.cached:
+            return cache.cached_response(self.model.__tablename__, self.get_page, self.etag_tables)
+        return self.get_page()
+
+    def get_page(self):
+        try:
+            limit, after = parse_page_args()
+            fields, embeds = parse_fieldset(self.row_fields or self.fields, self.embeds)
+            query = self.get_query(fields, embeds).order_by(self.model.id)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        etag, not_modified = versions.not_modified(
+            db.session.connection(), self.etag_tables or (self.model.__tablename__,))
+        if not_modified:
+            return not_modified
+        headers = versions.etag_headers(etag)
+
+        if limit is None:
+            return self.fetch(query, fields, embeds), 200, headers
+
+        if after is not None:
+            query = query.filter(self.model.id > after)
+        rows = self.fetch(query.limit(limit + 1), fields, embeds)
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = str(rows[-1]["id"])
+            args = request.args.to_dict()
+            args.update(limit=limit, after=next_cursor)
+            headers["X-Next-Cursor"] = next_cursor
+            headers["Link"] = f'<{url_for(request.endpoint, _external=False, **args)}>; rel="next"'
+        return rows, 200, headers
+
+# --- API Resources ---
+class StaffList(PaginatedListResource):
+    model = Staff
+    row_fields = STAFF_FIELDS
+    cached = True
+
+    def post(self):
+        try:
+            data = request.get_json()
+            staff = Staff(**data)
+            db.session.add(staff)
+            db.session.commit()
+            cache.invalidate("staff")
+            return serialize_staff(staff), 201
+        except Exception as e:
+            db.session.rollback()
+            return {"error": str(e)}, 400
+
+class OwnerList(PaginatedListResource):
+    model = Owner
+    row_fields = OWNER_FIELDS
+    cached = True
+
+    def apply_filters(self, query):
+        for param in ['name', 'email']:
+            value = request.args.get(param)
+            if value:
+                query = query.filter(prefix_filter(getattr(Owner, param), value))
+        return query
+
+    def post(self):
+        try:
+            data = request.get_json()
+            owner = Owner(**data)
+            db.session.add(owner)
+            db.session.commit()
+            cache.invalidate("owners")
+            return serialize_owner(owner), 201
+        except Exception as e:
+            db.session.rollback()
+            return {"error": str(e)}, 400
+
+class PetList(PaginatedListResource):
+    model = Pet
+    fields = PET_FIELDS
+    embeds = PET_EMBEDS
+    embed_loaders = PET_EMBED_LOADERS
+    etag_tables = PET_TABLES
+
+    def apply_filters(self, query):
+        for param in ['species', 'breed', 'sex', 'owner_id']:
+            value = request.args.get(param)
+            if value:
+                query = query.filter(getattr(Pet, param) == value)
+        return query
+
+    def post(self):
+        try:
+            data = request.get_json()
+            pet = Pet(
+                name=data["name"],
+                species=data["species"],
+                breed=data["breed"],
+                sex=data["sex"],
+                owner_id=int(data["owner_id"]) if data.get("owner_id") else None
+            )
+            db.session.add(pet)
+            db.session.flush()
+            for t in data.get("treatments", []):
+                pt = PetTreatment(
+                    pet=pet,
+                    treatment_id=t["treatment_id"],
+                    treatment_date=datetime.fromisoformat(t["treatment_date"]) if t.get("treatment_date") else None,
+                    notes=t.get("notes")
+                )
+                db.session.add(pt)
+            db.session.commit()
+            return serialize_pet(pet), 201
+        except Exception as e:
+            db.session.rollback()
+            return {"error": str(e)}, 400
+
+def sync_pet_treatments(pet, items):
+    """Make ``pet``'s treatments match the request's ``treatments`` list.
+
+    Pairs no longer listed are deleted, new ones inserted, and kept ones are
+    updated only if their date or notes changed, so an unchanged list costs
+    one SELECT and no writes.
+    """
+    wanted = {}
+    for t in items:
+        treatment_id = int(t["treatment_id"])
+        if treatment_id in wanted:
+            raise ValueError(f"treatment {treatment_id} is listed more than once")
+        date = datetime.fromisoformat(t["treatment_date"]) if t.get("treatment_date") else None
+        wanted[treatment_id] = (date, t.get("notes"))
+
+    kept = []
+    for pt in pet.pet_treatments:
+        if pt.treatment_id in wanted:
+            values = wanted.pop(pt.treatment_id)
+            if (pt.treatment_date, pt.notes) != values:
+                pt.treatment_date, pt.notes = values
+            kept.append(pt)
+    if wanted or len(kept) < len(pet.pet_treatments):
+        # assigning the collection deletes the dropped rows (delete-orphan)
+        pet.pet_treatments = kept + [
+            PetTreatment(treatment_id=treatment_id, treatment_date=date, notes=notes)
+            for treatment_id, (date, notes) in wanted.items()
+        ]
+
+class PetDetail(Resource):
+    def get(self, id):
+        try:
+            fields, embeds = parse_fieldset(PET_FIELDS, PET_EMBEDS)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        etag, not_modified = versions.not_modified(db.session.connection(), PET_TABLES)
+        if not_modified:
+            return not_modified
+        if not embeds:
+            table = Pet.__table__
+            row = db.session.execute(select(*(table.c[f] for f in fields)).where(table.c.id == id)).first()
+            if row is None:
+                return {"error": "Not Found"}, 404
+            return serialize_row(row), 200, versions.etag_headers(etag)
+        pet = Pet.query.options(
+            load_only(*(getattr(Pet, f) for f in fields)), *PET_EMBED_LOADERS["treatments"]
+        ).filter_by(id=id).first_or_404()
+        return sparse_serializer(fields, PET_EMBEDS)(pet), 200, versions.etag_headers(etag)
+
+    def patch(self, id):
+        """Partial update: only the fields present in the body change.
+
+        With ``treatments``, the pet's treatment list is replaced by it, but
+        only the rows that differ are written (see ``sync_pet_treatments``).
+        """
+        try:
+            pet = Pet.query.get_or_404(id)
+            data = request.get_json()
+            for field in ["name", "species", "breed", "sex", "color", "medical_notes", "owner_id"]:
+                if field in data:
+                    setattr(pet, field, data[field])
+            if "treatments" in data:
+                sync_pet_treatments(pet, data["treatments"])
+            db.session.commit()
+            pet = Pet.query.options(*PET_EMBED_LOADERS["treatments"]).filter_by(id=id).one()
+            return serialize_pet(pet), 200
+        except Exception as e:
+            db.session.rollback()
+            return {"error": str(e)}, 400
+
+    def delete(self, id):
+        pet = Pet.query.get_or_404(id)
+        db.session.delete(pet)
+        db.session.commit()
+        return {"message": "Pet deleted"}, 200
+
+class AppointmentFilters(ListFilters):
+    model = Appointment
+
+    def apply_filters(self, query):
+        query = date_range_filters(query, Appointment.date)
+        for param in ['pet_id', 'staff_id']:
+            value = parse_int_arg(param)
+            if value is not None:
+                query = query.filter(getattr(Appointment, param) == value)
+        reason = request.args.get('reason')
+        if reason:
+            query = query.filter(substring_filter(Appointment.reason, reason))
+        return query
+
+class AppointmentList(AppointmentFilters, PaginatedListResource):
+    row_fields = APPOINTMENT_FIELDS
+
+    def post(self):
+        try:
+            data = request.get_json()
+            start = datetime.fromisoformat(data["date"]) if data.get("date") else None
+            end = scheduling.appointment_end(start, data)
+            staff_id = data.get("staff_id")
+            if start is not None and staff_id:
+                if not scheduling.lock_staff(db.session, staff_id):
+                    db.session.rollback()
+                    return {"error": f"staff {staff_id} does not exist"}, 400
+                clashes = scheduling.conflicts(db.session.connection(), staff_id, start, end)
+                if clashes:
+                    db.session.rollback()
+                    return {"error": "staff member is already booked at that time", "conflicts": clashes}, 409
+            appt = Appointment(
+                date=start,
+                end_date=end,
+                reason=data.get("reason"),
+                pet_id=data.get("pet_id"),
+                staff_id=staff_id
+            )
+            db.session.add(appt)
+            db.session.commit()
+            body = serialize_appointment(appt)
+            events.publish("appointment.created", body)
+            return body, 201
+        except Exception as e:
+            db.session.rollback()
+            return {"error": str(e)}, 400
+
+class TreatmentFilters(ListFilters):
+    model = Treatment
+
+class TreatmentList(TreatmentFilters, PaginatedListResource):
+    fields = TREATMENT_FIELDS
+    embeds = TREATMENT_EMBEDS
+    embed_loaders = TREATMENT_EMBED_LOADERS
+    etag_tables = TREATMENT_TABLES
+
+    def post(self):
+        try:
+            data = request.get_json()
+            date_str = data.get("date")
+            treat = Treatment(
+                date=datetime.fromisoformat(date_str) if date_str else None,
+                description=data.get("description"),
+                staff_id=data.get("staff_id")
+            )
+            db.session.add(treat)
+            db.session.flush()
+
+            pet_id = data.get("pet_id")
+            if pet_id:
+                pet_treatment = PetTreatment(
+                    pet_id=pet_id,
+                    treatment_id=treat.id,
+                    treatment_date=datetime.fromisoformat(date_str) if date_str else None
+                )
+                db.session.add(pet_treatment)
+
+            db.session.commit()
+            return serialize_treatment(treat), 201
+        except Exception as e:
+            db.session.rollback()
+            return {"error": str(e)}, 400
+
+class MedicationList(PaginatedListResource):
+    model = Medication
+    row_fields = MEDICATION_FIELDS
+    cached = True
+
+    def post(self):
+        try:
+            data = request.get_json()
+            med = Medication(**data)
+            db.session.add(med)
+            db.session.commit()
+            cache.invalidate("medications")
+            return serialize_medication(med), 201
+        except Exception as e:
+            db.session.rollback()
+            return {"error": str(e)}, 400
+
+class BillingFilters(ListFilters):
+    model = Billing
+
+    def apply_filters(self, query):
+        query = date_range_filters(query, Billing.date)
+        pet_id = parse_int_arg('pet_id')
+        if pet_id is not None:
+            query = query.filter(Billing.pet_id == pet_id)
+        paid = parse_bool_arg('paid')
+        if paid is not None:
+            query = query.filter(Billing.paid == paid)
+        return query
+
+class BillingList(BillingFilters, PaginatedListResource):
+    row_fields = BILLING_FIELDS
+
+    def post(self):
+        try:
+            data = request.get_json()
+            bill = Billing(
+                pet_id=data["pet_id"],
+                date=datetime.fromisoformat(data["date"]) if data.get("date") else None,
+                amount=data["amount"],
+                description=data["description"],
+                paid=data.get("paid", False)
+            )
+            db.session.add(bill)
+            db.session.commit()
+            body = serialize_billing(bill)
+            events.publish("billing.created", body)
+            return body, 201
+        except Exception as e:
+            db.session.rollback()
+            return {"error": str(e)}, 400
+
+class BillingDetail(Resource):
+    def patch(self, id):
+        bill = Billing.query.get(id)
+        if not bill:
+            return {"error": "Not found"}, 404
+        try:
+            data = request.get_json()
+            changed = "paid" in data and data["paid"] != bill.paid
+            if changed:
+                bill.paid = data["paid"]
+            db.session.commit()
+            body = serialize_billing(bill)
+            if changed:
+                events.publish("billing.updated", body)
+            return body, 200
+        except Exception as e:
+            db.session.rollback()
+            return {"error": str(e)}, 400
+
+    def delete(self, id):
+        bill = Billing.query.get(id)
+        if not bill:
+            return {"error": "Not found"}, 404
+        try:
+            db.session.delete(bill)
+            db.session.commit()
+            return {"message": "Billing record deleted"}, 200
+        except Exception as e:
+            db.session.rollback()
+            return {"error": str(e)}, 400
+
+    def options(self, id):
+        return '', 200
+
+class PetProfile(Resource):
+    def get(self, id):
+        """The pet chart in one response (see profiles.py); ?appointments=, ?treatments=, ?billings= set section limits."""
+        try:
+            limits = {}
+            for section, default in profiles.DEFAULT_LIMITS.items():
+                limit = parse_int_arg(section)
+                if limit is not None and not 0 <= limit <= profiles.MAX_LIMIT:
+                    raise ValueError(f"{section} must be between 0 and {profiles.MAX_LIMIT}")
+                limits[section] = default if limit is None else limit
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        etag, not_modified = versions.not_modified(db.session.connection(), profiles.TABLES)
+        if not_modified:
+            return not_modified
+        profile = profiles.pet_profile(db.session.connection(), id, limits)
+        if profile is None:
+            return {"error": "Not Found"}, 404
+        return profile, 200, versions.etag_headers(etag)
+
+class BalanceResource(Resource):
+    """GET the running paid/unpaid totals kept in ``balance_model`` (see balances.py)."""
+    model = None
+    balance_model = None
+
+    def get(self, id):
+        balance = db.session.get(self.balance_model, id)
+        if balance is None and db.session.get(self.model, id) is None:
+            return {"error": "Not found"}, 404
+        return {"id": id, **balances.serialize_balance(balance)}, 200
+
+class PetBalanceDetail(BalanceResource):
+    model = Pet
+    balance_model = PetBalance
+
+class OwnerBalanceDetail(BalanceResource):
+    model = Owner
+    balance_model = OwnerBalance
+
+class AppointmentExport(export.StreamingExport, AppointmentFilters, Resource):
+    pass
+
+class TreatmentExport(export.StreamingExport, TreatmentFilters, Resource):
+    pass
+
+class BillingExport(export.StreamingExport, BillingFilters, Resource):
+    pass
+
+class BulkCreate(Resource):
+    def __init__(self, model):
+        self.model = model
+
+    def post(self):
+        try:
+            payload = bulk.parse_payload(request)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        if jobs.respond_async():
+            parse_errors = [{"index": i, "error": error} for i, (_, error) in enumerate(payload) if error]
+            if parse_errors:
+                return {"error": "validation failed, nothing was inserted", "errors": parse_errors}, 400
+            return jobs.accepted(jobs.enqueue("import", {
+                "resource": self.model.__tablename__,
+                "rows": [row for row, _ in payload],
+            }))
+        return bulk.bulk_create(self.model, payload)
+
+class CacheStats(Resource):
+    def get(self):
+        return cache.stats(), 200
+
+class Search(Resource):
+    def get(self):
+        q = request.args.get("q", "").strip()
+        if not q:
+            return {"error": "q is required"}, 400
+        try:
+            limit = parse_int_arg("limit")
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        if limit is None:
+            limit = 20
+        elif limit < 1 or limit > MAX_PAGE_SIZE:
+            return {"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}, 400
+        types = request.args.get("types")
+        kinds = types.split(",") if types else None
+        try:
+            hits = search.search(db.session.connection(), q, limit=limit, kinds=kinds)
+        except NotImplementedError as e:
+            return {"error": str(e)}, 501
+        return hits, 200
+
+class ChangeFeed(Resource):
+    def get(self):
+        """Changes after ``?since=``; without it, the seq to start syncing from."""
+        try:
+            since = parse_int_arg("since")
+            limit = parse_int_arg("limit")
+            if since is not None and since < 0:
+                raise ValueError("since must not be negative")
+            if limit is None:
+                limit = changes.DEFAULT_LIMIT
+            elif limit < 1 or limit > changes.MAX_LIMIT:
+                raise ValueError(f"limit must be between 1 and {changes.MAX_LIMIT}")
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        conn = db.session.connection()
+        if since is None:
+            return {"changes": [], "next": changes.latest_seq(conn), "more": False}, 200
+        try:
+            return changes.feed(conn, since, limit), 200
+        except changes.ChangesGone as e:
+            return {"error": str(e)}, 410
+
+class EventStream(Resource):
+    def get(self):
+        """Server-sent events for new appointments and billing changes (see events.py)."""
+        return events.stream_response(current_app._get_current_object())
+
+class AppointmentCalendar(Resource):
+    def get(self):
+        try:
+            start = parse_datetime_arg("from")
+            end = parse_datetime_arg("to")
+            staff_id = parse_int_arg("staff_id")
+            group = request.args.get("group", "day")
+            if start is None or end is None:
+                raise ValueError("from and to are required")
+            if not start < end <= start + timedelta(days=scheduling.MAX_CALENDAR_RANGE_DAYS):
+                raise ValueError(f"to must be after from and at most {scheduling.MAX_CALENDAR_RANGE_DAYS} days later")
+            if group not in scheduling.CALENDAR_GROUPS:
+                raise ValueError(f"group must be one of {', '.join(scheduling.CALENDAR_GROUPS)}")
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        etag, not_modified = versions.not_modified(db.session.connection(), ("appointments", "pets", "staff"))
+        if not_modified:
+            return not_modified
+        days = scheduling.calendar(db.session.connection(), start, end, group, staff_id)
+        return days, 200, versions.etag_headers(etag)
+
+class StaffAvailability(Resource):
+    def get(self, id):
+        try:
+            start = parse_datetime_arg("from")
+            end = parse_datetime_arg("to")
+            min_minutes = parse_int_arg("min_minutes") or 0
+            if start is None or end is None:
+                raise ValueError("from and to are required")
+            if not start < end <= start + timedelta(days=scheduling.MAX_AVAILABILITY_RANGE_DAYS):
+                raise ValueError(f"to must be after from and at most {scheduling.MAX_AVAILABILITY_RANGE_DAYS} days later")
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        if db.session.get(Staff, id) is None:
+            return {"error": "Not found"}, 404
+
+        etag, not_modified = versions.not_modified(db.session.connection(), ("appointments",))
+        if not_modified:
+            return not_modified
+        slots = scheduling.free_slots(db.session.connection(), id, start, end, min_minutes)
+        return slots, 200, versions.etag_headers(etag)
+
+class ReportResource(Resource):
+    """Base for /api/reports/*: runs ``report`` over ?from=&to= and returns the aggregate rows.
+
+    Responses carry a weak ETag from the versions of ``tables``. With
+    ``Prefer: respond-async`` the report runs as a background job instead.
+    """
+    name = None
+    report = None
+    # Every table the report reads from
+    tables = ()
+
+    def report_args(self):
+        """Report-specific keyword arguments from the request; raises ValueError."""
+        return {}
+
+    def get(self):
+        try:
+            kwargs = {"start": parse_datetime_arg("from"), "end": parse_datetime_arg("to")}
+            kwargs.update(self.report_args())
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        if jobs.respond_async():
+            return jobs.accepted(jobs.enqueue("report", {"report": self.name, "args": request.args.to_dict()}))
+
+        etag, not_modified = versions.not_modified(db.session.connection(), self.tables)
+        if not_modified:
+            return not_modified
+        rows = self.report(db.session.connection(), **kwargs)
+        return rows, 200, versions.etag_headers(etag)
+
+class RevenueReport(ReportResource):
+    name = "revenue"
+    report = staticmethod(reports.revenue)
+    tables = ("billings",)
+
+    def report_args(self):
+        period = request.args.get("period", "month")
+        if period not in reports.PERIODS:
+            raise ValueError(f"period must be one of {', '.join(reports.PERIODS)}")
+        return {"period": period}
+
+class UnpaidBalancesReport(ReportResource):
+    name = "unpaid-balances"
+    report = staticmethod(reports.unpaid_balances)
+    tables = ("billings", "pets", "owners")  # owner_balances changes only with these
+
+    def report_args(self):
+        limit = parse_int_arg("limit")
+        if limit is not None and (limit < 1 or limit > MAX_PAGE_SIZE):
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        return {"limit": limit}
+
+class AppointmentsByStaffReport(ReportResource):
+    name = "appointments-by-staff"
+    report = staticmethod(reports.appointments_by_staff)
+    tables = ("appointments", "staff")
+
+class TreatmentsBySpeciesReport(ReportResource):
+    name = "treatments-by-species"
+    report = staticmethod(reports.treatments_by_species)
+    tables = ("pet_treatments", "treatments", "pets")
+
+class JobList(Resource):
+    def post(self):
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return {"error": "expected a JSON object with kind and params"}, 400
+        try:
+            jobs.check_params(data.get("kind"), data.get("params"))
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        return jobs.accepted(jobs.enqueue(data["kind"], data["params"]))
+
+class JobDetail(Resource):
+    def get(self, id):
+        job = db.session.get(Job, id)
+        if job is None:
+            return {"error": "Not found"}, 404
+        return jobs.serialize_job(job), 200
+
+class JobResult(Resource):
+    def get(self, id):
+        job = db.session.get(Job, id)
+        if job is None:
+            return {"error": "Not found"}, 404
+        if job.status != "succeeded":
+            return {"error": f"job is {job.status}"}, 409
+        return jobs.result_response(job)
+
+# What background jobs can run, by the name used in their params
+BULK_MODELS = {model.__tablename__: model for model in (Pet, Appointment, Billing, Medication)}
+EXPORTS = {cls.model.__tablename__: cls for cls in (AppointmentExport, TreatmentExport, BillingExport)}
+REPORTS = {cls.name: cls for cls in (
+    RevenueReport, UnpaidBalancesReport, AppointmentsByStaffReport, TreatmentsBySpeciesReport,
+)}
+
+# --- API Routes ---
+def index():
+    return render_template("index.html")
+
+def not_found(e):
+    if request.path.startswith('/api/'):
+        return jsonify({"error": "Not Found"}), 404
+    return render_template("404.html"), 404
+
+def register(app, api):
+    """Attach every route, error handler and CLI command to ``app``."""
+    api.add_resource(StaffList, '/api/staff')
+    api.add_resource(OwnerList, '/api/owners')
+    api.add_resource(PetList, '/api/pets')
+    api.add_resource(PetDetail, '/api/pets/<int:id>')
+    api.add_resource(AppointmentList, '/api/appointments')
+    api.add_resource(TreatmentList, '/api/treatments')
+    api.add_resource(MedicationList, '/api/medications')
+    api.add_resource(BillingList, '/api/billings')
+    api.add_resource(BillingDetail, '/api/billings/<int:id>')
+    api.add_resource(StaffAvailability, '/api/staff/<int:id>/availability')
+    api.add_resource(PetBalanceDetail, '/api/pets/<int:id>/balance')
+    api.add_resource(PetProfile, '/api/pets/<int:id>/profile')
+    api.add_resource(OwnerBalanceDetail, '/api/owners/<int:id>/balance')
+    api.add_resource(Search, '/api/search')
+    api.add_resource(CacheStats, '/api/cache/stats')
+    api.add_resource(ChangeFeed, '/api/changes')
+    api.add_resource(EventStream, '/api/stream')
+    api.add_resource(AppointmentCalendar, '/api/appointments/calendar')
+    api.add_resource(AppointmentExport, '/api/appointments/export')
+    api.add_resource(TreatmentExport, '/api/treatments/export')
+    api.add_resource(BillingExport, '/api/billings/export')
+    api.add_resource(RevenueReport, '/api/reports/revenue')
+    api.add_resource(UnpaidBalancesReport, '/api/reports/unpaid-balances')
+    api.add_resource(AppointmentsByStaffReport, '/api/reports/appointments-by-staff')
+    api.add_resource(TreatmentsBySpeciesReport, '/api/reports/treatments-by-species')
+
+    api.add_resource(JobList, '/api/jobs')
+    api.add_resource(JobDetail, '/api/jobs/<int:id>')
+    api.add_resource(JobResult, '/api/jobs/<int:id>/result')
+
+    for path, model in BULK_MODELS.items():
+        api.add_resource(BulkCreate, f'/api/{path}/bulk', endpoint=f'{path}_bulk',
+                         resource_class_kwargs={'model': model})
+
+    app.cli.add_command(search.search_cli)
+    app.cli.add_command(balances.balances_cli)
+    app.cli.add_command(jobs.jobs_cli)
+    app.cli.add_command(changes.changes_cli)
+    app.cli.add_command(events.events_cli)
+    app.add_url_rule('/', 'index', index)
+    app.register_error_handler(404, not_found)
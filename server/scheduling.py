@@ -0,0 +1,138 @@
+"""Double-booking checks, free-slot search and calendar views of appointments.
+
+An appointment occupies ``[date, end_date)``. The overlap check and the
+free-slot search are each a single range scan of ``ix_appointments_staff_id_date_end_date``: an appointment
+overlapping ``[start, end)`` must begin before ``end`` and, because no
+appointment is longer than ``APPOINTMENT_MAX_DURATION``, after
+``start - APPOINTMENT_MAX_DURATION``, so the scan never reads the staff
+member's whole history.
+
+Concurrent bookings for the same staff member are serialized by a lock
+taken before the overlap check, so two requests cannot both see a free slot
+and both book it. On Postgres it is the staff member's row lock
+(``SELECT ... FOR UPDATE``). SQLite ignores ``FOR UPDATE``, and pysqlite
+only begins the transaction at the first write, so there the lock is a
+no-op ``UPDATE`` of the staff row, which takes the database write lock.
+"""
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import select, update
+
+from models import Appointment, Pet, Staff, APPOINTMENT_DEFAULT_DURATION, APPOINTMENT_MAX_DURATION
+
+MAX_AVAILABILITY_RANGE_DAYS = 31
+
+
+def appointment_end(start, data):
+    """End of a new appointment from ``end_date`` or ``duration`` (minutes); raises ValueError.
+
+    Enforces ``APPOINTMENT_MAX_DURATION``, which the overlap scan relies on,
+    so every write path that sets ``end_date`` must go through it.
+    """
+    if start is None:
+        if data.get("end_date") or data.get("duration") is not None:
+            raise ValueError("an appointment needs a date to have an end_date or duration")
+        return None
+    if data.get("end_date"):
+        end = datetime.fromisoformat(data["end_date"])
+    elif data.get("duration") is not None:
+        end = start + timedelta(minutes=int(data["duration"]))
+    else:
+        end = start + APPOINTMENT_DEFAULT_DURATION
+    if not start < end <= start + APPOINTMENT_MAX_DURATION:
+        max_hours = int(APPOINTMENT_MAX_DURATION.total_seconds() // 3600)
+        raise ValueError(f"appointments must last between 1 minute and {max_hours} hours")
+    return end
+
+
+def lock_staff(session, staff_id):
+    """Take the booking lock for ``staff_id``; returns False if there is no such staff member."""
+    if session.get_bind().dialect.name == "sqlite":
+        # other writers now wait for this transaction; updated_at is set to
+        # itself so its onupdate default does not fire
+        return session.execute(
+            update(Staff).where(Staff.id == staff_id).values(id=Staff.id, updated_at=Staff.updated_at)
+        ).rowcount > 0
+    return session.execute(
+        select(Staff.id).where(Staff.id == staff_id).with_for_update()
+    ).first() is not None
+
+
+def _overlapping(staff_id, start, end):
+    return (
+        select(Appointment.id, Appointment.date, Appointment.end_date)
+        .where(
+            Appointment.staff_id == staff_id,
+            Appointment.date < end,
+            Appointment.date > start - APPOINTMENT_MAX_DURATION,
+            Appointment.end_date > start,
+        )
+        .order_by(Appointment.date)
+    )
+
+
+def conflicts(conn, staff_id, start, end, exclude_id=None):
+    """Appointments of ``staff_id`` overlapping ``[start, end)``, as dicts."""
+    query = _overlapping(staff_id, start, end)
+    if exclude_id is not None:
+        query = query.where(Appointment.id != exclude_id)
+    return [row._asdict() for row in conn.execute(query)]
+
+
+def free_slots(conn, staff_id, start, end, min_minutes=0):
+    """Gaps in ``staff_id``'s bookings within ``[start, end)``, from one query."""
+    slots = []
+    cursor = start
+    for _, booked_start, booked_end in conn.execute(_overlapping(staff_id, start, end)):
+        if booked_start > cursor:
+            slots.append((cursor, booked_start))
+        cursor = max(cursor, booked_end)
+    if cursor < end:
+        slots.append((cursor, end))
+    return [
+        {"start": s, "end": e, "minutes": int((e - s).total_seconds() // 60)}
+        for s, e in slots
+        if (e - s).total_seconds() >= min_minutes * 60
+    ]
+
+
+# --- Calendar ---
+CALENDAR_GROUPS = ("day", "week")
+MAX_CALENDAR_RANGE_DAYS = 62
+
+
+def _bucket_start(value, group):
+    day = value.date()
+    return day - timedelta(days=day.weekday()) if group == "week" else day
+
+
+def calendar(conn, start, end, group="day", staff_id=None):
+    """Appointments in ``[start, end)`` grouped by day or ISO week (starting Monday).
+
+    Every bucket in the range is returned, empty or not, so a calendar can
+    render it directly. Entries carry only what a calendar cell shows. The
+    date range (and staff filter) is served by ``ix_appointments_date_staff_id``.
+    """
+    query = (
+        select(
+            Appointment.id, Appointment.date, Appointment.end_date, Appointment.reason,
+            Appointment.pet_id, Pet.name.label("pet_name"),
+            Appointment.staff_id, Staff.name.label("staff_name"),
+        )
+        .outerjoin(Pet, Pet.id == Appointment.pet_id)
+        .outerjoin(Staff, Staff.id == Appointment.staff_id)
+        .where(Appointment.date >= start, Appointment.date < end)
+        .order_by(Appointment.date, Appointment.id)
+    )
+    if staff_id is not None:
+        query = query.where(Appointment.staff_id == staff_id)
+
+    step = timedelta(days=7 if group == "week" else 1)
+    buckets = {}
+    day = _bucket_start(start, group)
+    while day < end.date() or (day == end.date() and end.time() != time.min):
+        buckets[day] = []
+        day += step
+    for row in conn.execute(query):
+        buckets.setdefault(_bucket_start(row.date, group), []).append(row._asdict())
+    return [{"period": day, "appointments": rows} for day, rows in buckets.items()]
@@ -0,0 +1,233 @@
+"""Full-text search over owners, pets and treatments.
+
+Documents live in one index table with a (kind, ref_id) key:
+
+- SQLite: an FTS5 virtual table ``search_index`` ranked with bm25().
+- Postgres: ``search_documents`` with a generated, GIN-indexed tsvector
+  column ranked with ts_rank().
+
+The index is kept in sync from a session ``after_flush`` hook, which
+rebuilds the document of every Owner, Pet and Treatment touched by the
+flush (PetTreatment notes are folded into their pet's document) inside the
+same transaction. Writes that bypass the ORM unit of work (Core inserts,
+bulk_insert_mappings) must call ``reindex`` themselves or be followed by
+``flask search rebuild``.
+"""
+import re
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, event, select, text
+from sqlalchemy.orm import Session
+
+from config import db
+from models import Owner, Pet, Treatment, PetTreatment
+
+KINDS = ("owner", "pet", "treatment")
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+REBUILD_BATCH_SIZE = 1000
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "kind UNINDEXED, ref_id UNINDEXED, title, body, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+]
+POSTGRES_DDL = [
+    "CREATE TABLE IF NOT EXISTS search_documents ("
+    "kind VARCHAR(16) NOT NULL, ref_id INTEGER NOT NULL, title TEXT, body TEXT, "
+    "document TSVECTOR GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(body, '')), 'B')) STORED, "
+    "PRIMARY KEY (kind, ref_id))",
+    "CREATE INDEX IF NOT EXISTS ix_search_documents_document ON search_documents USING gin (document)",
+]
+
+
+def supported(conn):
+    return conn.dialect.name in ("sqlite", "postgresql")
+
+
+def _doc_rowid(kind, ref_id):
+    # FTS5 can only look rows up cheaply by rowid, so encode the key into it
+    return ref_id * len(KINDS) + KIND_CODES[kind]
+
+
+# --- Schema ---
+def create_search_table(conn):
+    ddl = {"sqlite": SQLITE_DDL, "postgresql": POSTGRES_DDL}.get(conn.dialect.name, [])
+    for statement in ddl:
+        conn.execute(text(statement))
+
+
+def drop_search_table(conn):
+    if conn.dialect.name == "sqlite":
+        conn.execute(text("DROP TABLE IF EXISTS search_index"))
+    elif conn.dialect.name == "postgresql":
+        conn.execute(text("DROP TABLE IF EXISTS search_documents"))
+
+
+# db.create_all()/drop_all() manage the index table alongside the models
+event.listen(db.metadata, "after_create", lambda target, conn, **kw: create_search_table(conn))
+event.listen(db.metadata, "before_drop", lambda target, conn, **kw: drop_search_table(conn))
+
+
+# --- Documents ---
+def _join(*parts):
+    return " ".join(p for p in parts if p)
+
+
+def _owner_documents(conn, ids):
+    rows = conn.execute(select(Owner.id, Owner.name, Owner.email, Owner.phone).where(Owner.id.in_(ids)))
+    return {r.id: (r.name, _join(r.email, r.phone)) for r in rows}
+
+
+def _pet_documents(conn, ids):
+    notes = {}
+    for pet_id, note in conn.execute(
+        select(PetTreatment.pet_id, PetTreatment.notes).where(PetTreatment.pet_id.in_(ids))
+    ):
+        notes.setdefault(pet_id, []).append(note)
+    rows = conn.execute(
+        select(Pet.id, Pet.name, Pet.species, Pet.breed, Pet.color, Pet.medical_notes).where(Pet.id.in_(ids))
+    )
+    return {
+        r.id: (r.name, _join(r.species, r.breed, r.color, r.medical_notes, *notes.get(r.id, [])))
+        for r in rows
+    }
+
+
+def _treatment_documents(conn, ids):
+    rows = conn.execute(select(Treatment.id, Treatment.description).where(Treatment.id.in_(ids)))
+    return {r.id: (r.description, "") for r in rows}
+
+
+DOCUMENT_BUILDERS = {
+    "owner": _owner_documents,
+    "pet": _pet_documents,
+    "treatment": _treatment_documents,
+}
+
+
+def reindex(conn, kind, ids):
+    """Rebuild the documents for ``ids`` of ``kind``; ids that no longer exist are removed."""
+    ids = list(ids)
+    if not ids or not supported(conn):
+        return
+    docs = DOCUMENT_BUILDERS[kind](conn, ids)
+    if conn.dialect.name == "sqlite":
+        conn.execute(text("DELETE FROM search_index WHERE rowid = :rowid"),
+                     [{"rowid": _doc_rowid(kind, i)} for i in ids])
+        if docs:
+            conn.execute(
+                text("INSERT INTO search_index (rowid, kind, ref_id, title, body) "
+                     "VALUES (:rowid, :kind, :ref_id, :title, :body)"),
+                [{"rowid": _doc_rowid(kind, i), "kind": kind, "ref_id": i, "title": t, "body": b}
+                 for i, (t, b) in docs.items()],
+            )
+    else:
+        conn.execute(text("DELETE FROM search_documents WHERE kind = :kind AND ref_id = ANY(:ids)"),
+                     {"kind": kind, "ids": ids})
+        if docs:
+            conn.execute(
+                text("INSERT INTO search_documents (kind, ref_id, title, body) "
+                     "VALUES (:kind, :ref_id, :title, :body)"),
+                [{"kind": kind, "ref_id": i, "title": t, "body": b} for i, (t, b) in docs.items()],
+            )
+
+
+def rebuild(conn):
+    """Drop and repopulate the whole index."""
+    drop_search_table(conn)
+    create_search_table(conn)
+    for kind, model in (("owner", Owner), ("pet", Pet), ("treatment", Treatment)):
+        last_id = 0
+        while True:
+            ids = conn.execute(
+                select(model.id).where(model.id > last_id).order_by(model.id).limit(REBUILD_BATCH_SIZE)
+            ).scalars().all()
+            if not ids:
+                break
+            reindex(conn, kind, ids)
+            last_id = ids[-1]
+
+
+# --- Sync ---
+def _touched_documents(session):
+    touched = {kind: set() for kind in KINDS}
+    changed = list(session.new) + list(session.deleted) + [
+        obj for obj in session.dirty if session.is_modified(obj, include_collections=False)
+    ]
+    for obj in changed:
+        if isinstance(obj, Owner):
+            touched["owner"].add(obj.id)
+        elif isinstance(obj, Pet):
+            touched["pet"].add(obj.id)
+        elif isinstance(obj, Treatment):
+            touched["treatment"].add(obj.id)
+        elif isinstance(obj, PetTreatment):
+            touched["pet"].add(obj.pet_id)
+    return touched
+
+
+@event.listens_for(Session, "after_flush")
+def sync_search_index(session, flush_context):
+    touched = _touched_documents(session)
+    if not any(touched.values()):
+        return
+    conn = session.connection()
+    for kind, ids in touched.items():
+        reindex(conn, kind, {i for i in ids if i is not None})
+
+
+# --- Query ---
+def _terms(q):
+    return re.findall(r"\w+", q.lower())
+
+
+def search(conn, q, limit=20, kinds=None):
+    """Return hits for ``q`` as dicts with type, id, title, snippet and score (higher is better)."""
+    terms = _terms(q)
+    if not terms:
+        return []
+    kinds = [k for k in (kinds or KINDS) if k in KINDS]
+    params = {"limit": limit, "kinds": kinds}
+
+    if conn.dialect.name == "sqlite":
+        # every term must match, each as a prefix
+        params["match"] = " ".join(f'"{t}"*' for t in terms)
+        statement = text(
+            "SELECT kind, ref_id, title, snippet(search_index, -1, '[', ']', '...', 10) AS snippet, "
+            "-bm25(search_index, 0, 0, 10.0, 1.0) AS score "
+            "FROM search_index WHERE search_index MATCH :match AND kind IN :kinds "
+            "ORDER BY score DESC LIMIT :limit"
+        )
+    elif conn.dialect.name == "postgresql":
+        params["tsquery"] = " & ".join(f"{t}:*" for t in terms)
+        statement = text(
+            "SELECT kind, ref_id, title, "
+            "ts_headline('simple', coalesce(body, ''), q, 'StartSel=[, StopSel=], MaxFragments=1') AS snippet, "
+            "ts_rank(document, q) AS score "
+            "FROM search_documents, to_tsquery('simple', :tsquery) AS q "
+            "WHERE document @@ q AND kind IN :kinds "
+            "ORDER BY score DESC LIMIT :limit"
+        )
+    else:
+        raise NotImplementedError(f"full-text search is not supported on {conn.dialect.name}")
+
+    statement = statement.bindparams(bindparam("kinds", expanding=True))
+    return [
+        {"type": r.kind, "id": r.ref_id, "title": r.title, "snippet": r.snippet, "score": r.score}
+        for r in conn.execute(statement, params)
+    ]
+
+
+# --- CLI ---
+search_cli = AppGroup("search", help="Manage the full-text search index.")
+
+
+@search_cli.command("rebuild")
+def rebuild_command():
+    """Rebuild the search index from the current tables."""
+    with db.engine.begin() as conn:
+        rebuild(conn)
+    click.echo("Search index rebuilt.")
@@ -1,206 +1,303 @@
 #!/usr/bin/env python3
+"""Generate a synthetic, referentially consistent clinic dataset.
 
+    python seed.py                                  # small demo dataset
+    python seed.py --owners 100000 --seed 42        # ~1.9M rows for load testing
+
+Every model gets rows. Rows are built from pools of Faker values generated up
+front and written with batched Core inserts, so the cost per row is a few
+random choices rather than a Faker call and an ORM flush. The same ``--seed``
+and arguments always produce the same data. Appointment slots never overlap
+for a staff member, so the data passes the booking checks.
+
+Existing clinic data is deleted first. The search index, billing balances,
+table versions, change feed and response cache are refreshed at the end, since
+Core inserts bypass their hooks.
+"""
 # Standard library imports
-from random import randint, choice as rc, uniform
+import argparse
+import itertools
+import random
+import time
 from datetime import datetime, timedelta
 
 # Remote library imports
-from faker import Faker
+from sqlalchemy import delete, insert, text
 
 # Local imports
-from app import app
-from models import db, Staff, Owner, Pet, Appointment, Treatment, PetTreatment, Medication, Billing
+from config import create_app
+from models import (
+    db, Staff, Owner, Pet, Appointment, Treatment, PetTreatment, Medication, Billing, PetBalance, OwnerBalance,
+)
+import balances
+import cache
+import changes
+import search
+import versions
 
-if __name__ == '__main__':
-    fake = Faker()
+SPECIES = ['Dog', 'Cat', 'Bird', 'Rabbit', 'Reptile']
+SPECIES_WEIGHTS = [45, 35, 8, 7, 5]
+BREEDS = {
+    'Dog': ['Labrador', 'German Shepherd', 'Beagle', 'Bulldog', 'Boerboel'],
+    'Cat': ['Siamese', 'Persian', 'Maine Coon', 'Ragdoll', 'Sphynx'],
+    'Bird': ['Parakeet', 'Canary', 'Cockatiel', 'Lovebird'],
+    'Rabbit': ['Holland Lop', 'Netherland Dwarf', 'Mini Rex'],
+    'Reptile': ['Leopard Gecko', 'Corn Snake', 'Bearded Dragon', 'Chameleon']
+}
+SEXES = ['Male', 'Female']
+COLORS = ['Black', 'White', 'Brown', 'Golden', 'Spotted', 'Gray']
+CLINICAL_ROLES = ['Veterinarian', 'Technician', 'Assistant']
+APPOINTMENT_REASONS = [
+    "Vaccination checkup", "Annual physical exam", "Dental cleaning",
+    "Surgery consultation", "Skin condition evaluation", "Wound care follow-up",
+    "Behavioral concern", "Nutritional advice", "Fever and lethargy",
+    "Limping and joint pain", "Flea infestation", "Routine blood work"
+]
+TREATMENT_DESCRIPTIONS = [
+    "Antibiotic injection for infection", "Wound cleaning and dressing", "Dental extraction",
+    "Vaccination administration", "Deworming treatment", "Ear infection treatment",
+    "Spaying procedure", "Emergency care for trauma", "Anti-fungal application",
+    "Post-op follow-up"
+]
+MEDICATION_NAMES = ['Amoxicillin', 'Prednisone', 'Metronidazole', 'Carprofen', 'Enrofloxacin']
+FREQUENCIES = ["Once daily", "Twice daily", "Every 8 hours", "As needed"]
+BILLING_DESCRIPTIONS = [
+    "Consultation fee", "Vaccination charge", "Dental procedure",
+    "Medication cost", "Minor surgery", "Follow-up appointment",
+    "Emergency service", "Hospitalization fee", "X-ray imaging"
+]
+
+# Clinic hours for appointment slots
+OPENING_HOUR = 9
+SLOTS_PER_DAY = 16
+SLOT = timedelta(minutes=30)
+
+# Deleted children first
+CLINIC_MODELS = [
+    PetTreatment, Medication, Appointment, Treatment, Billing,
+    PetBalance, OwnerBalance, Pet, Owner, Staff,
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--owners", type=int, default=20)
+    parser.add_argument("--staff", type=int, default=10, help="at least 3: a receptionist, an accountant and clinicians")
+    parser.add_argument("--pets-per-owner", type=float, default=2.0, help="average; each owner has 1 to 2x-1 pets")
+    parser.add_argument("--appointments-per-pet", type=float, default=2.0)
+    parser.add_argument("--treatments-per-pet", type=float, default=1.0)
+    parser.add_argument("--medications-per-treatment", type=float, default=1.5)
+    parser.add_argument("--billings-per-pet", type=float, default=2.0)
+    parser.add_argument("--start", type=datetime.fromisoformat, default=datetime(2024, 1, 1),
+                        help="first day of generated history (default 2024-01-01)")
+    parser.add_argument("--days", type=int, default=365, help="days of history for treatments and billings")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+    if args.staff < 3:
+        parser.error("--staff must be at least 3")
+    return args
+
+
+class DataGenerator:
+    """Yields row dicts for each table. IDs are assigned here, so foreign keys
+    are known without reading anything back."""
+
+    def __init__(self, args):
+        # Faker is slow to import and only needed when seeding
+        from faker import Faker
+
+        self.args = args
+        self.rng = random.Random(args.seed)
+        fake = Faker()
+        fake.seed_instance(args.seed)
+        self.first_names = [fake.first_name() for _ in range(2000)]
+        self.last_names = [fake.last_name() for _ in range(2000)]
+        self.domains = sorted({fake.free_email_domain() for _ in range(50)})
+        self.phones = [fake.phone_number() for _ in range(2000)]
+        self.sentences = [fake.sentence(nb_words=10) for _ in range(2000)]
+        self.pet_count = 0
+        self.treatment_dates = []
+        self.clinicians = []
+
+    def _count(self, average):
+        """A random count whose mean is about ``average``."""
+        low, high = max(0, round(average * 0.5)), round(average * 1.5)
+        return self.rng.randint(low, max(low, high)) if average >= 1 else int(self.rng.random() < average)
+
+    def _person(self, i):
+        first, last = self.rng.choice(self.first_names), self.rng.choice(self.last_names)
+        email = f"{first}.{last}.{i}@{self.rng.choice(self.domains)}".lower()
+        return {"name": f"{first} {last}", "email": email, "phone": self.rng.choice(self.phones)}
+
+    def _date(self):
+        return self.args.start + timedelta(seconds=self.rng.randrange(self.args.days * 86400))
+
+    def staff(self):
+        roles = ["Receptionist", "Accountant"]
+        for i in range(1, self.args.staff + 1):
+            role = roles[i - 1] if i <= len(roles) else self.rng.choice(CLINICAL_ROLES)
+            if role in CLINICAL_ROLES:
+                self.clinicians.append(i)
+            yield {"id": i, "role": role, **self._person(i)}
+
+    def owners(self):
+        for i in range(1, self.args.owners + 1):
+            yield {"id": i, **self._person(i)}
+
+    def pets(self):
+        per_owner = self.args.pets_per_owner
+        for owner_id in range(1, self.args.owners + 1):
+            for _ in range(self.rng.randint(1, max(1, round(2 * per_owner - 1)))):
+                self.pet_count += 1
+                species = self.rng.choices(SPECIES, SPECIES_WEIGHTS)[0]
+                yield {
+                    "id": self.pet_count,
+                    "name": self.rng.choice(self.first_names),
+                    "species": species,
+                    "breed": self.rng.choice(BREEDS[species]),
+                    "sex": self.rng.choice(SEXES),
+                    "color": self.rng.choice(COLORS),
+                    "dob": self.args.start - timedelta(days=self.rng.randrange(365, 15 * 365)),
+                    "medical_notes": self.rng.choice(self.sentences),
+                    "owner_id": owner_id,
+                }
+
+    def appointments(self):
+        # Fill 30-minute slots from --start round-robin over the clinicians:
+        # appointment k goes to clinician k % n in slot k // n, so no staff
+        # member is ever double-booked.
+        total = round(self.pet_count * self.args.appointments_per_pet)
+        n = len(self.clinicians)
+        for k in range(total):
+            slot = k // n
+            start = (self.args.start + timedelta(days=slot // SLOTS_PER_DAY, hours=OPENING_HOUR)
+                     + SLOT * (slot % SLOTS_PER_DAY))
+            yield {
+                "id": k + 1,
+                "date": start,
+                "end_date": start + self.rng.choice((SLOT / 2, SLOT)),
+                "reason": self.rng.choice(APPOINTMENT_REASONS),
+                "pet_id": self.rng.randint(1, self.pet_count),
+                "staff_id": self.clinicians[k % n],
+            }
+
+    def treatments(self):
+        for i in range(1, round(self.pet_count * self.args.treatments_per_pet) + 1):
+            self.treatment_dates.append(self._date())
+            yield {
+                "id": i,
+                "date": self.treatment_dates[-1],
+                "description": self.rng.choice(TREATMENT_DESCRIPTIONS),
+                "staff_id": self.rng.choice(self.clinicians),
+            }
+
+    def pet_treatments(self):
+        # every treatment is given to one pet, one in ten to a second one
+        for treatment_id, date in enumerate(self.treatment_dates, 1):
+            pets = {self.rng.randint(1, self.pet_count)}
+            if self.rng.random() < 0.1:
+                pets.add(self.rng.randint(1, self.pet_count))
+            for pet_id in sorted(pets):
+                yield {
+                    "pet_id": pet_id,
+                    "treatment_id": treatment_id,
+                    "treatment_date": date,
+                    "notes": self.rng.choice(self.sentences),
+                }
+
+    def medications(self):
+        for treatment_id in range(1, len(self.treatment_dates) + 1):
+            for _ in range(self._count(self.args.medications_per_treatment)):
+                yield {
+                    "name": self.rng.choice(MEDICATION_NAMES),
+                    "dosage": f"{self.rng.randint(5, 500)} mg",
+                    "frequency": self.rng.choice(FREQUENCIES),
+                    "treatment_id": treatment_id,
+                }
+
+    def billings(self):
+        for pet_id in range(1, self.pet_count + 1):
+            for _ in range(self._count(self.args.billings_per_pet)):
+                yield {
+                    "date": self._date(),
+                    "amount": round(self.rng.uniform(20.0, 500.0), 2),
+                    "description": self.rng.choice(BILLING_DESCRIPTIONS),
+                    "paid": self.rng.random() < 0.7,
+                    "pet_id": pet_id,
+                }
+
+
+def insert_batches(model, rows, batch_size):
+    """Insert ``rows`` with executemany, ``batch_size`` at a time; returns the row count."""
+    count = 0
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, batch_size)):
+        db.session.execute(insert(model), batch)
+        count += len(batch)
+    db.session.commit()
+    return count
+
+
+def reset_sequences(conn):
+    """Move Postgres id sequences past the explicitly inserted ids."""
+    if conn.dialect.name != "postgresql":
+        return
+    for model in (Staff, Owner, Pet, Appointment, Treatment, Medication, Billing):
+        table = model.__tablename__
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), GREATEST(COALESCE(MAX(id), 0), 1)) FROM {table}"
+        ))
+
+
+def generate(args, log=print):
+    """Replace the clinic data with a generated dataset; needs an app context. Returns the row count."""
+    log("Deleting existing data...")
+    for model in CLINIC_MODELS:
+        db.session.execute(delete(model))
+    db.session.commit()
+
+    generator = DataGenerator(args)
+    started = time.perf_counter()
+    total = 0
+    for model, rows in [
+        (Staff, generator.staff()),
+        (Owner, generator.owners()),
+        (Pet, generator.pets()),
+        (Appointment, generator.appointments()),
+        (Treatment, generator.treatments()),
+        (PetTreatment, generator.pet_treatments()),
+        (Medication, generator.medications()),
+        (Billing, generator.billings()),
+    ]:
+        table_started = time.perf_counter()
+        count = insert_batches(model, rows, args.batch_size)
+        total += count
+        log(f"Seeded {count} {model.__tablename__} in {time.perf_counter() - table_started:.1f}s")
+
+    log("Rebuilding search index, balances and table versions...")
+    conn = db.session.connection()
+    reset_sequences(conn)
+    search.rebuild(conn)
+    balances.rebuild(conn)
+    tables = [model.__tablename__ for model in CLINIC_MODELS]
+    versions.bump(conn, tables)
+    changes.reset(conn)
+    db.session.commit()
+    cache.invalidate(*tables)
+
+    elapsed = time.perf_counter() - started
+    log(f"Seeding complete: {total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s).")
+    return total
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    app = create_app()
     with app.app_context():
         print("Starting seed...")
+        generate(args)
 
-        # Clear existing data
-        print("Deleting existing data...")
-        db.session.query(PetTreatment).delete()
-        db.session.query(Medication).delete()
-        db.session.query(Appointment).delete()
-        db.session.query(Treatment).delete()
-        db.session.query(Billing).delete()
-        db.session.query(Pet).delete()
-        db.session.query(Owner).delete()
-        db.session.query(Staff).delete()
-        db.session.commit()
-
-        #Staff
-        print("Seeding Staff...")
-        staff_list = []
-        receptionist = Staff(
-            name=fake.name(),
-            role="Receptionist",
-            email=fake.unique.email(),
-            phone=fake.phone_number()
-        )
-        accountant = Staff(
-            name=fake.name(),
-            role="Accountant",
-            email=fake.unique.email(),
-            phone=fake.phone_number()
-        )
-        db.session.add(receptionist)
-        db.session.add(accountant)
-        staff_list.extend([receptionist, accountant])
-
-        roles = ['Veterinarian', 'Technician', 'Assistant']
-        for _ in range(8):
-            staff = Staff(
-                name=fake.name(),
-                role=rc(roles),
-                email=fake.unique.email(),
-                phone=fake.phone_number()
-            )
-            db.session.add(staff)
-            staff_list.append(staff)
-        db.session.commit()
-
-        # Owners and Pets
-        print("Seeding Owners and Pets...")
-        species_list = ['Dog', 'Cat', 'Bird', 'Rabbit', 'Reptile']
-        breeds = {
-            'Dog': ['Labrador', 'German Shepherd', 'Beagle', 'Bulldog', 'Boerboel'],
-            'Cat': ['Siamese', 'Persian', 'Maine Coon', 'Ragdoll', 'Sphynx'],
-            'Bird': ['Parakeet', 'Canary', 'Cockatiel', 'Lovebird'],
-            'Rabbit': ['Holland Lop', 'Netherland Dwarf', 'Mini Rex'],
-            'Reptile': ['Leopard Gecko', 'Corn Snake', 'Bearded Dragon', 'Chameleon']
-        }
-        sex_list = ['Male', 'Female']
-        color_list = ['Black', 'White', 'Brown', 'Golden', 'Spotted', 'Gray']
-        owners_list = []
-        pets_list = []
-        for _ in range(20):
-            owner = Owner(
-                name=fake.name(),
-                email=fake.unique.email(),
-                phone=fake.phone_number()
-            )
-            db.session.add(owner)
-            owners_list.append(owner)
-
-            for _ in range(randint(1, 3)):
-                species = rc(species_list)
-                breed = rc(breeds[species])
-                pet = Pet(
-                    name=fake.first_name(),
-                    species=species,
-                    breed=breed,
-                    sex=rc(sex_list),
-                    color=rc(color_list),
-                    dob=fake.date_of_birth(minimum_age=1, maximum_age=15),
-                    medical_notes=fake.sentence(nb_words=10),
-                    owner=owner
-                )
-                db.session.add(pet)
-                pets_list.append(pet)
-        db.session.commit()
-
-        # Appointments
-        print("Seeding Appointments...")
-        appointment_reasons = [
-            "Vaccination checkup", "Annual physical exam", "Dental cleaning",
-            "Surgery consultation", "Skin condition evaluation", "Wound care follow-up",
-            "Behavioral concern", "Nutritional advice", "Fever and lethargy", 
-            "Limping and joint pain", "Flea infestation", "Routine blood work"
-        ]
-        appointments_list = []
-        for _ in range(30):
-            appointment = Appointment(
-                date=fake.date_time_between(start_date='-1y', end_date='now'),
-                reason=rc(appointment_reasons),
-                pet=rc(pets_list),
-                staff=rc(staff_list)
-            )
-            db.session.add(appointment)
-            appointments_list.append(appointment)
-        db.session.commit()
-
-        # Seed Treatments and PetTreatments
-        print("Seeding Treatments and PetTreatments...")
-        treatment_descriptions = [
-            "Antibiotic injection for infection",
-            "Wound cleaning and dressing",
-            "Dental extraction",
-            "Vaccination administration",
-            "Deworming treatment",
-            "Ear infection treatment",
-            "Spaying procedure",
-            "Emergency care for trauma",
-            "Anti-fungal application",
-            "Post-op follow-up"
-        ]
-        treatments_list = []
-        for _ in range(25):
-            staff_member = rc(staff_list)
-            treatment = Treatment(
-                date=fake.date_time_between(start_date='-1y', end_date='now'),
-                description=rc(treatment_descriptions),
-                staff=staff_member
-            )
-            db.session.add(treatment)
-            treatments_list.append(treatment)
-        db.session.commit()
-
-        pet_treatments_list = []
-        for treatment in treatments_list:
-            assigned_pets = set()
-            for _ in range(randint(1, 2)):
-                pet = rc(pets_list)
-                if pet.id in assigned_pets:
-                    continue
-                assigned_pets.add(pet.id)
-                pet_treatment = PetTreatment(
-                    pet=pet,
-                    treatment=treatment,
-                    treatment_date=treatment.date,
-                    notes=fake.sentence(nb_words=12)
-                )
-                db.session.add(pet_treatment)
-                pet_treatments_list.append(pet_treatment)
-        db.session.commit()
-
-        # Medications
-        print("Seeding Medications...")
-        medication_names = ['Amoxicillin', 'Prednisone', 'Metronidazole', 'Carprofen', 'Enrofloxacin']
-        frequencies = ["Once daily", "Twice daily", "Every 8 hours", "As needed"]
-        for treatment in treatments_list:
-            for _ in range(randint(0, 3)):
-                medication = Medication(
-                    name=rc(medication_names),
-                    dosage=f"{randint(5, 500)} mg",
-                    frequency=rc(frequencies),
-                    treatment=treatment
-                )
-                db.session.add(medication)
-        db.session.commit()
-
-        # Seed Billings
-        print("Seeding Billings...")
-        billing_descriptions = [
-            "Consultation fee", "Vaccination charge", "Dental procedure", 
-            "Medication cost", "Minor surgery", "Follow-up appointment", 
-            "Emergency service", "Hospitalization fee", "X-ray imaging"
-        ]
-        for pet in pets_list:
-            for _ in range(randint(0, 3)):
-                billing_date = rc([appt.date for appt in appointments_list]) if appointments_list else fake.date_time_between(start_date='-1y', end_date='now')
-                billing = Billing(
-                    date=billing_date,
-                    amount=round(uniform(20.0, 500.0), 2),
-                    description=rc(billing_descriptions),
-                    paid=rc([True, False]),
-                    pet=pet
-                )
-                db.session.add(billing)
-        db.session.commit()
-
-        print(f"Seeded {len(staff_list)} staff")
-        print(f"Seeded {len(owners_list)} owners and {len(pets_list)} pets")
-        print(f"Seeded {len(appointments_list)} appointments")
-        print(f"Seeded {len(treatments_list)} treatments and {len(pet_treatments_list)} pet treatments")
-        print(f"Seeded medications for treatments")
-        print("Seeding complete.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Response serialization.
+
+Serializers are declared as field lists and turn either ORM objects or Core
+``Row`` tuples into plain dicts. Dates are left as ``datetime`` values and
+formatted by the JSON encoder, which is orjson when installed (set
+``JSON_ENCODER=json`` to force the standard library) and always emits
+compact output.
+"""
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from operator import attrgetter
+
+from flask import make_response
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# --- Encoder ---
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _orjson_dumps(obj):
+    return orjson.dumps(obj, default=_default)
+
+def _json_dumps(obj):
+    return json.dumps(obj, separators=(",", ":"), default=_default).encode()
+
+ENCODERS = {"json": (_json_dumps, json.loads)}
+if orjson is not None:
+    ENCODERS["orjson"] = (_orjson_dumps, orjson.loads)
+
+ENCODER = os.getenv("JSON_ENCODER", "orjson" if orjson is not None else "json")
+if ENCODER not in ENCODERS:
+    raise RuntimeError(f"JSON_ENCODER must be one of {', '.join(ENCODERS)}")
+dumps, loads = ENCODERS[ENCODER]
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider (jsonify, request.get_json) backed by ``dumps``/``loads``."""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+
+def output_json(data, code, headers=None):
+    """Flask-RESTful representation for application/json."""
+    resp = make_response(dumps(data), code)
+    resp.headers.extend(headers or {})
+    resp.mimetype = "application/json"
+    return resp
+
+
+def init_app(app, api):
+    app.json = FastJSONProvider(app)
+    api.representation("application/json")(output_json)
+
+
+# --- Serializers ---
+def fields_serializer(fields):
+    """Build a serializer for ``fields``: ORM object -> dict."""
+    getter = attrgetter(*fields)
+    if len(fields) == 1:
+        # attrgetter returns a bare value, not a tuple, for a single name
+        return lambda obj: {fields[0]: getter(obj)}
+    return lambda obj: dict(zip(fields, getter(obj)))
+
+def serialize_row(row):
+    """Core Row -> dict, without hydrating an ORM object."""
+    return row._asdict()
+
+STAFF_FIELDS = ("id", "name", "role", "email", "phone")
+OWNER_FIELDS = ("id", "name", "email", "phone")
+PET_FIELDS = ("id", "name", "species", "breed", "sex", "owner_id")
+APPOINTMENT_FIELDS = ("id", "date", "end_date", "reason", "pet_id", "staff_id")
+TREATMENT_FIELDS = ("id", "date", "description", "staff_id")
+PET_TREATMENT_FIELDS = ("pet_id", "treatment_id", "treatment_date", "notes")
+MEDICATION_FIELDS = ("id", "name", "dosage", "frequency", "treatment_id")
+BILLING_FIELDS = ("id", "date", "amount", "description", "paid", "pet_id")
+JOB_FIELDS = ("id", "kind", "status", "attempts", "error", "created_at", "started_at", "finished_at")
+
+serialize_staff = fields_serializer(STAFF_FIELDS)
+serialize_owner = fields_serializer(OWNER_FIELDS)
+serialize_appointment = fields_serializer(APPOINTMENT_FIELDS)
+serialize_medication = fields_serializer(MEDICATION_FIELDS)
+serialize_billing = fields_serializer(BILLING_FIELDS)
+serialize_job_fields = fields_serializer(JOB_FIELDS)
+
+def serialize_pet_treatment(pt):
+    return {
+        "treatment_id": pt.treatment_id,
+        "description": pt.treatment.description,
+        "treatment_date": pt.treatment_date,
+        "notes": pt.notes,
+    }
+
+# Nested collections, by the name clients pass in ?include=
+PET_EMBEDS = {
+    "treatments": lambda pet: [serialize_pet_treatment(pt) for pt in pet.pet_treatments],
+}
+TREATMENT_EMBEDS = {
+    "medications": lambda treat: [serialize_medication(m) for m in treat.medications],
+    "pets": lambda treat: [{"id": p.id, "name": p.name} for p in treat.pets],
+}
+
+def sparse_serializer(fields, embeds):
+    """Build a serializer for ``fields`` plus ``embeds`` ({key: obj -> value}), e.g. from ?fields=/?include=."""
+    base = fields_serializer(fields)
+    if not embeds:
+        return base
+
+    def serialize(obj):
+        data = base(obj)
+        for key, embed in embeds.items():
+            data[key] = embed(obj)
+        return data
+    return serialize
+
+serialize_pet = sparse_serializer(PET_FIELDS, PET_EMBEDS)
+serialize_treatment = sparse_serializer(TREATMENT_FIELDS, TREATMENT_EMBEDS)
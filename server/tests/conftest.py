@@ -0,0 +1,28 @@
+import pytest
+
+from benchmarks.common import setup_app, populate
+
+
+@pytest.fixture
+def app(tmp_path):
+    import cache
+
+    app, db = setup_app(db_path=str(tmp_path / "test.db"))
+    # cached responses of an earlier test's database would still match its versions
+    cache.invalidate(*db.metadata.tables)
+    with app.app_context():
+        populate(db, owners=3)
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def db(app):
+    from config import db
+
+    return db
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,110 @@
+"""Stored balances must equal ``balances.rebuild()`` after every kind of write."""
+import pytest
+from sqlalchemy import select
+
+import balances
+from models import Owner, Pet, Billing, PetBalance, OwnerBalance
+
+
+def _snapshot(conn):
+    """{(table, key): fields} of the balance tables, without all-zero rows (read as zero anyway)."""
+    rows = {}
+    for model, key in ((PetBalance, PetBalance.pet_id), (OwnerBalance, OwnerBalance.owner_id)):
+        for row in conn.execute(select(key, *(getattr(model, f) for f in balances.FIELDS))):
+            values = tuple(row)[1:]
+            if any(values):
+                rows[(model.__tablename__, row[0])] = values
+    return rows
+
+
+def assert_balances_rebuilt(db):
+    with db.engine.connect() as conn:
+        stored = _snapshot(conn)
+        balances.rebuild(conn)
+        rebuilt = _snapshot(conn)
+        conn.rollback()
+    assert stored.keys() == rebuilt.keys()
+    for key, (paid_total, unpaid_total, paid_count, unpaid_count) in rebuilt.items():
+        assert stored[key] == (pytest.approx(paid_total), pytest.approx(unpaid_total), paid_count, unpaid_count), key
+
+
+def post_billing(client, pet_id, amount, paid=False):
+    response = client.post("/api/billings", json={
+        "pet_id": pet_id, "amount": amount, "description": "Visit", "date": "2025-02-01T00:00:00", "paid": paid,
+    })
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()["id"]
+
+
+def test_populated_balances_match(db):
+    assert_balances_rebuilt(db)
+
+
+def test_post_patch_delete_billings(client, db):
+    unpaid = post_billing(client, 1, 40.0)
+    assert_balances_rebuilt(db)
+    paid = post_billing(client, 2, "12.5", paid=True)
+    assert_balances_rebuilt(db)
+
+    for bill, value in ((unpaid, True), (paid, False), (unpaid, True), (unpaid, False)):
+        assert client.patch(f"/api/billings/{bill}", json={"paid": value}).status_code == 200
+        assert_balances_rebuilt(db)
+
+    for bill in (unpaid, paid):
+        assert client.delete(f"/api/billings/{bill}").status_code == 200
+        assert_balances_rebuilt(db)
+
+
+def test_deleting_every_bill_of_a_pet(client, db):
+    for bill in db.session.scalars(select(Billing.id).where(Billing.pet_id == 1)).all():
+        assert client.delete(f"/api/billings/{bill}").status_code == 200
+    assert_balances_rebuilt(db)
+
+
+def test_moving_a_pet_to_another_owner(client, db):
+    post_billing(client, 1, 30.0)
+    assert client.patch("/api/pets/1", json={"owner_id": 3}).status_code == 200
+    assert_balances_rebuilt(db)
+    assert client.patch("/api/pets/1", json={"owner_id": None}).status_code == 200
+    assert_balances_rebuilt(db)
+    assert client.patch("/api/pets/1", json={"owner_id": 2}).status_code == 200
+    assert_balances_rebuilt(db)
+
+
+def test_moving_a_pet_and_changing_its_bills_in_one_flush(db):
+    pet = db.session.get(Pet, 1)
+    pet.owner_id = 2
+    for bill in pet.billings:
+        bill.paid = not bill.paid
+    db.session.add(Billing(pet_id=1, amount=5.0, description="Extra", paid=False))
+    db.session.commit()
+    assert_balances_rebuilt(db)
+
+
+def test_deleting_a_pet_cascades_to_its_bills(client, db):
+    post_billing(client, 3, 20.0)
+    assert client.delete("/api/pets/3").status_code == 200
+    assert_balances_rebuilt(db)
+
+
+def test_deleting_an_owner_cascades_to_pets_and_bills(db):
+    db.session.delete(db.session.get(Owner, 2))
+    db.session.commit()
+    assert_balances_rebuilt(db)
+
+
+def test_removing_a_pet_from_its_owner_deletes_the_orphan(db):
+    owner = db.session.get(Owner, 1)
+    owner.pets.remove(db.session.get(Pet, 1))
+    db.session.commit()
+    assert db.session.get(Pet, 1) is None
+    assert_balances_rebuilt(db)
+
+
+def test_bulk_import(client, db):
+    response = client.post("/api/billings/bulk", json=[
+        {"pet_id": 1, "amount": 10, "description": "Bulk"},
+        {"pet_id": 4, "amount": 2.5, "description": "Bulk", "paid": True},
+    ])
+    assert response.status_code == 201, response.get_json()
+    assert_balances_rebuilt(db)
@@ -0,0 +1,130 @@
+"""The change feed: commit-ordered seqs, tombstones for every delete, exact paging."""
+from sqlalchemy import select
+
+import changes
+from models import Owner, Pet, Change
+
+
+NEW_OWNER = {"name": "New Owner", "email": "new@example.com", "phone": "555-0199"}
+
+
+def _log(db, since=0):
+    return db.session.execute(
+        select(Change.seq, Change.table_name, Change.row_id, Change.op).where(Change.seq > since).order_by(Change.seq)
+    ).all()
+
+
+def _existing_rows(db):
+    """{(table, row_id)} of every row in the tracked tables."""
+    rows = set()
+    for table, (model, _) in changes.TRACKED.items():
+        primary_key = list(model.__table__.primary_key.columns)
+        rows.update((table, changes.row_id(key)) for key in db.session.execute(select(*primary_key)))
+    return rows
+
+
+def _write_some(client):
+    """A mix of inserts, updates and deletes over several commits."""
+    owner = client.post("/api/owners", json=NEW_OWNER).get_json()
+    bill = client.post("/api/billings", json={"pet_id": 1, "amount": 20, "description": "Visit"}).get_json()
+    responses = [
+        client.patch(f"/api/billings/{bill['id']}", json={"paid": True}),
+        client.patch("/api/pets/2", json={"name": "Renamed", "owner_id": owner["id"]}),
+        client.post("/api/appointments", json={"date": "2031-03-01T09:00:00", "pet_id": 2, "staff_id": 4}),
+        client.delete(f"/api/billings/{bill['id']}"),
+        client.delete("/api/pets/3"),
+    ]
+    assert all(r.status_code in (200, 201) for r in responses)
+
+
+def test_seqs_increase_strictly_across_commits(client, db):
+    last = changes.latest_seq(db.session.connection())
+    db.session.commit()
+    requests = [
+        lambda: client.post("/api/billings", json={"pet_id": 1, "amount": 5, "description": "A"}),
+        lambda: client.patch("/api/pets/1", json={"name": "B"}),
+        lambda: client.post("/api/owners", json=NEW_OWNER),
+        lambda: client.delete("/api/pets/4"),
+    ]
+    for request in requests:
+        assert request().status_code in (200, 201)
+        entries = _log(db, since=last)
+        db.session.commit()
+        assert entries, "every write is logged"
+        seqs = [entry.seq for entry in entries]
+        assert seqs == sorted(set(seqs))
+        assert seqs[0] > last
+        last = seqs[-1]
+
+
+def assert_deletes_tombstoned(db, before, since):
+    gone = before - _existing_rows(db)
+    tombstones = {(e.table_name, e.row_id) for e in _log(db, since) if e.op == "delete"}
+    assert gone
+    assert gone <= tombstones
+
+
+def test_deleted_pet_and_cascades_get_tombstones(client, db):
+    before, since = _existing_rows(db), changes.latest_seq(db.session.connection())
+    assert client.delete("/api/pets/1").status_code == 200
+    assert_deletes_tombstoned(db, before, since)
+
+
+def test_deleted_owner_and_cascades_get_tombstones(db):
+    before, since = _existing_rows(db), changes.latest_seq(db.session.connection())
+    db.session.delete(db.session.get(Owner, 2))
+    db.session.commit()
+    gone = before - _existing_rows(db)
+    assert {table for table, _ in gone} >= {"owners", "pets", "appointments", "billings", "pet_treatments"}
+    assert_deletes_tombstoned(db, before, since)
+
+
+def test_orphaned_rows_get_tombstones(db):
+    before, since = _existing_rows(db), changes.latest_seq(db.session.connection())
+    owner = db.session.get(Owner, 1)
+    owner.pets.remove(db.session.get(Pet, 1))
+    db.session.get(Pet, 2).pet_treatments.pop()
+    db.session.commit()
+    assert ("pets", "1") in before - _existing_rows(db)
+    assert_deletes_tombstoned(db, before, since)
+    # a deleted row is not also logged as updated by the same flush
+    assert ("pets", "1", "upsert") not in {(e.table_name, e.row_id, e.op) for e in _log(db, since)}
+
+
+def test_paging_returns_each_change_exactly_once(client, db):
+    since = start = changes.latest_seq(db.session.connection())
+    _write_some(client)
+    log = _log(db, start)
+    assert len(log) > 3
+
+    pages, seen = [], []
+    while True:
+        response = client.get(f"/api/changes?since={since}&limit=3")
+        assert response.status_code == 200
+        page = response.get_json()
+        pages.append(page)
+        seen += [change["seq"] for change in page["changes"]]
+        assert page["next"] >= since
+        since = page["next"]
+        if not page["more"]:
+            break
+
+    assert len(seen) == len(set(seen))
+    assert seen == sorted(seen)
+    assert since == log[-1].seq
+    # within a page only a row's last entry is kept, so the pages hold
+    # exactly the log entries that are not superseded inside their page
+    expected = []
+    for offset in range(0, len(log), 3):
+        chunk = log[offset:offset + 3]
+        last = {(e.table_name, e.row_id): e.seq for e in chunk}
+        expected += [e.seq for e in chunk if last[(e.table_name, e.row_id)] == e.seq]
+    assert seen == expected
+    # and the final op of every row matches the log
+    final = {}
+    for page in pages:
+        for change in page["changes"]:
+            key = change["id"] if isinstance(change["id"], list) else [change["id"]]
+            final[(change["table"], changes.row_id(key))] = change["op"]
+    assert final == {(e.table_name, e.row_id): e.op for e in log}
+    assert client.get(f"/api/changes?since={since}&limit=3").get_json() == {"changes": [], "next": since, "more": False}
@@ -0,0 +1,95 @@
+"""Per-table change counters and weak ETags built from them.
+
+Every flush bumps the ``table_versions`` row of each table it writes to,
+inside the same transaction, so a reader sees a new version exactly when it
+can see the new data. List and detail endpoints derive a weak ETag from the
+versions of the tables their response is built from and answer
+``If-None-Match`` with a 304 after a single primary-key lookup, without
+touching the row data.
+
+Writes that bypass the unit of work (Core inserts and deletes) must call
+``bump`` themselves.
+"""
+from flask import Response, request
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import TableVersion
+
+_DIALECT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def bump(conn, tables):
+    """Increment the version of every table in ``tables``."""
+    tables = sorted(set(tables))  # fixed order, so concurrent writers lock rows alike
+    if not tables:
+        return
+    dialect_insert = _DIALECT_INSERTS.get(conn.dialect.name)
+    if dialect_insert is None:
+        conn.execute(
+            update(TableVersion)
+            .where(TableVersion.table_name.in_(tables))
+            .values(version=TableVersion.version + 1)
+        )
+        return
+    statement = dialect_insert(TableVersion).values([{"table_name": t, "version": 1} for t in tables])
+    conn.execute(statement.on_conflict_do_update(
+        index_elements=[TableVersion.table_name],
+        set_={"version": TableVersion.version + 1},
+    ))
+
+
+def current(conn, tables):
+    """Return {table: version} for ``tables``; tables never written are at 0."""
+    found = dict(conn.execute(
+        select(TableVersion.table_name, TableVersion.version).where(TableVersion.table_name.in_(tables))
+    ).all())
+    return {t: found.get(t, 0) for t in tables}
+
+
+def written_tables(session):
+    """Names of the tables the pending flush writes to."""
+    tables = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        if isinstance(obj, TableVersion):
+            continue
+        state = inspect(obj)
+        tables.add(state.mapper.local_table.name)
+        # many-to-many collections write to their association table
+        for rel in state.mapper.relationships:
+            if rel.secondary is not None and state.attrs[rel.key].history.has_changes():
+                tables.add(rel.secondary.name)
+    return tables
+
+
+@event.listens_for(Session, "after_flush")
+def bump_written_tables(session, flush_context):
+    tables = written_tables(session)
+    if tables:
+        bump(session.connection(), tables)
+
+
+# --- Conditional GET ---
+def etag_for(conn, tables):
+    versions = current(conn, tables)
+    return "-".join(str(versions[t]) for t in tables)
+
+
+def not_modified(conn, tables):
+    """Return (etag, response). ``response`` is a 304 when the client's copy is current, else None."""
+    etag = etag_for(conn, tables)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        response.headers["Cache-Control"] = "no-cache"
+        return etag, response
+    return etag, None
+
+
+def etag_headers(etag):
+    # no-cache: browsers may store the response but must revalidate it, which
+    # turns repeat loads into If-None-Match requests without client changes
+    return {"ETag": f'W/"{etag}"', "Cache-Control": "no-cache"}